@@ -0,0 +1,98 @@
+"""Micro-benchmarks for entity representations.
+
+Run with ``python -m game.benchmarks``.
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from .constants import GRID_WIDTH, GRID_HEIGHT
+from .entities.body import SnakeBody
+
+
+def _random_walk(length: int, rng: random.Random):
+    x, y = rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT)
+    cells = []
+    for _ in range(length):
+        dx, dy = rng.choice(((0, 1), (0, -1), (1, 0), (-1, 0)))
+        x, y = (x + dx) % GRID_WIDTH, (y + dy) % GRID_HEIGHT
+        cells.append((x, y))
+    return cells
+
+
+def _allocated_bytes(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return after - before
+
+
+def segment_memory(snakes: int = 200, length: int = 500) -> Dict[str, float]:
+    """Bytes per body segment: list of (x, y) tuples versus SnakeBody"""
+    rng = random.Random(0)
+    walks = [_random_walk(length, rng) for _ in range(snakes)]
+    segments = snakes * length
+
+    # Rebuild fresh tuples so the baseline owns its segments like a live game would
+    tuple_bytes = _allocated_bytes(lambda: [[(x + 0, y + 0) for x, y in walk] for walk in walks])
+    compact_bytes = _allocated_bytes(lambda: [SnakeBody(walk) for walk in walks])
+    return {
+        "segments": segments,
+        "list_of_tuples_bytes_per_segment": tuple_bytes / segments,
+        "snake_body_bytes_per_segment": compact_bytes / segments,
+    }
+
+
+def move_speed(length: int = 500, moves: int = 200_000) -> Dict[str, float]:
+    """Time a head push plus tail pop, the per-tick body update (SnakeBody.advance in Snake.move)"""
+    walk = _random_walk(length, random.Random(1))
+
+    body_list = list(walk)
+    start = time.perf_counter()
+    for _ in range(moves):
+        body_list.insert(0, (1, 1))
+        body_list.pop()
+    list_ns = (time.perf_counter() - start) / moves * 1e9
+
+    body = SnakeBody(walk)
+    start = time.perf_counter()
+    for _ in range(moves):
+        body.advance(GRID_WIDTH + 1)
+    ring_ns = (time.perf_counter() - start) / moves * 1e9
+
+    return {"list_move_ns": list_ns, "snake_body_move_ns": ring_ns}
+
+
+def iterate_speed(length: int = 500, passes: int = 2000) -> Dict[str, float]:
+    """Time walking every (x, y) segment head first, as drawing and snapshots do each frame"""
+    walk = _random_walk(length, random.Random(2))
+    segments = length * passes
+
+    body_list = list(walk)
+    start = time.perf_counter()
+    for _ in range(passes):
+        for x, y in body_list:
+            pass
+    list_ns = (time.perf_counter() - start) / segments * 1e9
+
+    body = SnakeBody(walk)
+    start = time.perf_counter()
+    for _ in range(passes):
+        for x, y in body:
+            pass
+    ring_ns = (time.perf_counter() - start) / segments * 1e9
+
+    return {"list_iterate_ns_per_segment": list_ns, "snake_body_iterate_ns_per_segment": ring_ns}
+
+
+if __name__ == "__main__":
+    from .harness import print_report
+
+    print_report({**segment_memory(), **move_speed(), **iterate_speed()}, width=36, precision=1)
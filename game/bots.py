@@ -0,0 +1,165 @@
+import time
+from collections import deque
+from typing import List, Tuple
+from .controls import is_reverse
+from .enums import Direction
+from .grid import DIRECTIONS, WALL
+from .simulation import MatchState
+
+WIN = 1_000_000
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def legal_directions(direction: Direction) -> List[Direction]:
+    """Directions a snake can actually turn to (reversing is ignored by change_direction)"""
+    return [d for d in DIRECTIONS if not is_reverse(d, direction)]
+
+
+class SearchBot:
+    """Plays one snake by minimax over cloned MatchStates.
+
+    Each ply both snakes choose a direction at once; the bot assumes the
+    opponent picks the reply that is worst for it. Search deepens one ply at
+    a time up to ``depth`` and stops when ``time_budget_ms`` runs out, using
+    the best move from the deepest ply it completed.
+    """
+
+    def __init__(self, player: int, depth: int = 4, time_budget_ms: float = 10.0,
+                 space_limit: int = 32):
+        self.player = player
+        self.me = player - 1
+        self.opponent = 1 - self.me
+        self.depth = depth
+        self.time_budget_ms = time_budget_ms
+        self.space_limit = space_limit
+        self.deadline = 0.0
+
+        # Statistics from the last decision
+        self.nodes = 0
+        self.completed_depth = 0
+
+    def choose(self, state: MatchState) -> Direction:
+        self.deadline = time.perf_counter() + self.time_budget_ms / 1000
+        self.nodes = 0
+        self.completed_depth = 0
+        my_moves = legal_directions(state.snakes[self.me].direction)
+        best_move = state.snakes[self.me].direction
+
+        for depth in range(1, self.depth + 1):
+            try:
+                _, move = self._search_root(state, my_moves, depth)
+            except SearchTimeout:
+                break
+            best_move = move
+            self.completed_depth = depth
+            # Try the previous best first so a cut-off search still ranks it well
+            my_moves.remove(move)
+            my_moves.insert(0, move)
+        return best_move
+
+    def _search_root(self, state: MatchState, my_moves: List[Direction], depth: int) -> Tuple[float, Direction]:
+        best_value, best_move = -float("inf"), my_moves[0]
+        for move in my_moves:
+            value = self._min_value(state, move, depth, best_value)
+            if value > best_value:
+                best_value, best_move = value, move
+        return best_value, best_move
+
+    def _min_value(self, state: MatchState, my_move: Direction, depth: int, alpha: float) -> float:
+        """The opponent's best reply to my_move (alpha-beta pruned on our side's alpha)"""
+        worst = float("inf")
+        for their_move in legal_directions(state.snakes[self.opponent].direction):
+            self.nodes += 1
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+            child = state.clone()
+            moves = [None, None]
+            moves[self.me], moves[self.opponent] = my_move, their_move
+            child.step(*moves)
+
+            if depth <= 1 or child.is_over:
+                value = self.evaluate(child)
+            else:
+                value = self._max_value(child, depth - 1)
+            worst = min(worst, value)
+            if worst <= alpha:
+                break
+        return worst
+
+    def _max_value(self, state: MatchState, depth: int) -> float:
+        best = -float("inf")
+        for move in legal_directions(state.snakes[self.me].direction):
+            best = max(best, self._min_value(state, move, depth, best))
+        return best
+
+    def evaluate(self, state: MatchState) -> float:
+        me, them = state.snakes[self.me], state.snakes[self.opponent]
+        if not me.alive and not them.alive:
+            # Both dead: the game falls back to comparing scores
+            return (me.score - them.score) * 100
+        if not me.alive:
+            return -WIN + state.tick
+        if not them.alive:
+            return WIN - state.tick
+
+        value = (me.score - them.score) * 10 + (len(me) - len(them)) * 5
+        value += self._free_space(state, me.head) * 2
+        if state.food is not None:
+            value -= state.board.distance(me.head, state.food)
+        return value
+
+    def _free_space(self, state: MatchState, start: int) -> int:
+        """Cells reachable from start, capped at space_limit"""
+        blocked = state.obstacles.union(*(snake.cells() for snake in state.snakes))
+        next_cell = state.board.next_cell
+        seen = {start}
+        frontier = deque([start])
+        while frontier and len(seen) < self.space_limit:
+            cell = frontier.popleft()
+            for neighbor in next_cell[cell]:
+                if neighbor == WALL or neighbor in seen or neighbor in blocked:
+                    continue
+                seen.add(neighbor)
+                frontier.append(neighbor)
+        return len(seen) - 1
+
+
+def run_benchmark(clones: int = 100_000, decisions: int = 50) -> dict:
+    """Time MatchState cloning and bot decisions on a mid-game position"""
+    import random
+    from .simulation import SnakeState
+    from .grid import to_cell
+
+    rng = random.Random(1)
+    body1 = [to_cell(20 - i, 10) for i in range(60)]
+    body2 = [to_cell(20 - i, 20) for i in range(60)]
+    obstacles = frozenset(to_cell(rng.randrange(50), rng.randrange(2, 9)) for _ in range(12))
+    state = MatchState([SnakeState(body1, Direction.RIGHT), SnakeState(body2, Direction.RIGHT)],
+                       to_cell(30, 15), (), obstacles)
+
+    start = time.perf_counter()
+    for _ in range(clones):
+        state.clone()
+    clone_us = (time.perf_counter() - start) / clones * 1e6
+
+    bot = SearchBot(1, depth=6, time_budget_ms=10)
+    nodes, depths = 0, 0
+    start = time.perf_counter()
+    for _ in range(decisions):
+        bot.choose(state)
+        nodes += bot.nodes
+        depths += bot.completed_depth
+    decision_ms = (time.perf_counter() - start) / decisions * 1000
+
+    return {"clone_us": clone_us, "decision_ms": decision_ms,
+            "nodes_per_decision": nodes / decisions, "mean_completed_depth": depths / decisions}
+
+
+if __name__ == "__main__":
+    from .harness import print_report
+
+    print_report(run_benchmark(), width=22)
@@ -0,0 +1,483 @@
+"""Differential conformance harness for alternative rules engines.
+
+The reference is today's Game: Snake.move, grow and shrink, plus
+Game.check_powerup_collisions, check_collisions and update_game_state,
+stepped one base-speed tick (two half ticks, so boosted snakes get their
+extra move) at a time. A candidate engine is driven with the same seeded
+random input log next to it, and the observable state of both is compared
+after every tick. The first divergence is shrunk to a minimal input log
+that still reproduces it.
+
+Food and power-up placement are part of the input log rather than engine
+randomness, so a candidate only has to implement the rules, not the RNG.
+Each tick of the log is (turn 1, turn 2, food cell, power-up): turns are
+DIRECTIONS indices or None, the food cell is where eaten food reappears,
+and power-up is None or (cell, POWERUP_TYPES index) to spawn before moving.
+
+Candidates take the freshly started reference Game and provide step(tick)
+and observe(); MatchStateEngine wraps game.simulation.MatchState.
+
+The default inputs provoke crashes, so snakes rarely pass ten segments. The
+grow mode feeds them instead, to cover long bodies and the repeated tail
+cells a Grow power-up leaves behind.
+"""
+
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .constants import WINNERS
+from .entities import PowerUp
+from .entities.powerup import POWERUP_TYPES
+from .enums import PowerUpType
+from .grid import DIRECTIONS, DIRECTION_INDEX, NUM_CELLS, WALL, from_cell, to_cell
+from .harness import map_on_workers, print_report, worker_game
+from .simulation import MatchState
+
+TickInput = Tuple[Optional[int], Optional[int], int, Optional[Tuple[int, int]]]
+SHRINK_CANDIDATES = 3
+
+
+def food_cell_for(tick_input: TickInput, respawns: int) -> int:
+    """Where food reappears after the tick's n-th meal (usually only one)"""
+    return (tick_input[2] + respawns * 7919) % NUM_CELLS
+
+
+def winner_of(alive1: bool, alive2: bool, score1: int, score2: int) -> Optional[int]:
+    """Game.update_game_state's verdict: 1, 2, 0 for a tie, None while both live"""
+    if alive1 and alive2:
+        return None
+    if not alive1 and not alive2:
+        return 1 if score1 > score2 else 2 if score2 > score1 else 0
+    return 1 if alive1 else 2
+
+
+class ReferenceEngine:
+    """The Game rules as they are today"""
+
+    def __init__(self, game):
+        self.game = game
+        self.tick_input: Optional[TickInput] = None
+        self.respawns = 0
+        self.powerups_collected = 0
+        # Spawns come from the input log, not the game's timer and RNG
+        game.powerup_spawn_interval = sys.maxsize
+        game.respawn_food_safely = self._respawn_food
+
+    def _respawn_food(self):
+        self.game.food.x, self.game.food.y = from_cell(food_cell_for(self.tick_input, self.respawns))
+        self.respawns += 1
+
+    def step(self, tick_input: TickInput) -> TickInput:
+        """Play a tick; returns it with any spawn the game would never make dropped"""
+        game = self.game
+        turn1, turn2, food, powerup = tick_input
+        if powerup is not None and not self.can_spawn(powerup[0]):
+            tick_input, powerup = (turn1, turn2, food, None), None
+        self.tick_input, self.respawns = tick_input, 0
+        if powerup is not None:
+            spawned = PowerUp(POWERUP_TYPES[powerup[1]], game.rng)
+            spawned.x, spawned.y = from_cell(powerup[0])
+            game.power_ups.append(spawned)
+        if turn1 is not None:
+            game.snake1.change_direction(DIRECTIONS[turn1])
+        if turn2 is not None:
+            game.snake2.change_direction(DIRECTIONS[turn2])
+
+        power_ups = len(game.power_ups)
+        half_tick = game.base_speed // 2
+        for _ in range(2):
+            if not game.game_over:
+                game.update(game.now + half_tick)
+        self.powerups_collected += power_ups - len(game.power_ups)
+        return tick_input
+
+    def can_spawn(self, cell: int) -> bool:
+        """Game.spawn_powerup's rules: two at most, never on snakes, food or obstacles"""
+        game = self.game
+        position = from_cell(cell)
+        return len(game.power_ups) < 2 and position != game.food.get_position() and \
+            position not in game.snake1.body and position not in game.snake2.body and \
+            all(position != obs.get_position() for obs in game.obstacles)
+
+    @property
+    def over(self) -> bool:
+        return self.game.game_over
+
+    def observe(self) -> Tuple:
+        game = self.game
+        snakes = tuple((tuple(snake.body.cell_list()), DIRECTION_INDEX[snake.direction],
+                        snake.alive, snake.score) for snake in (game.snake1, game.snake2))
+        food = to_cell(game.food.x, game.food.y) if game.food else None
+        power_ups = tuple((to_cell(pu.x, pu.y), POWERUP_TYPES.index(pu.power_type))
+                          for pu in game.power_ups)
+        return snakes + (food, power_ups, WINNERS.get(game.winner))
+
+
+class MatchStateEngine:
+    """game.simulation.MatchState, the search bots' engine, as a candidate"""
+
+    state_class = MatchState
+
+    def __init__(self, game):
+        template = MatchState.from_game(game, game.now)
+        self.state = self.state_class(template.snakes, template.food, template.power_ups,
+                                      template.obstacles, template.board)
+        self.state.respawn_food = self._respawn_food
+        self.tick_input: Optional[TickInput] = None
+        self.respawns = 0
+
+    def _respawn_food(self) -> int:
+        cell = food_cell_for(self.tick_input, self.respawns)
+        self.respawns += 1
+        return cell
+
+    def step(self, tick_input: TickInput):
+        turn1, turn2, _, powerup = tick_input
+        self.tick_input, self.respawns = tick_input, 0
+        if powerup is not None:
+            self.state.power_ups += ((powerup[0], POWERUP_TYPES[powerup[1]]),)
+        self.state.step(None if turn1 is None else DIRECTIONS[turn1],
+                        None if turn2 is None else DIRECTIONS[turn2])
+
+    @property
+    def over(self) -> bool:
+        return self.state.is_over
+
+    def observe(self) -> Tuple:
+        state = self.state
+        snakes = tuple((tuple(snake.cells()), DIRECTION_INDEX[snake.direction], snake.alive, snake.score)
+                       for snake in state.snakes)
+        power_ups = tuple((cell, POWERUP_TYPES.index(power_type)) for cell, power_type in state.power_ups)
+        winner = winner_of(*(snake.alive for snake in state.snakes), *(snake.score for snake in state.snakes))
+        return snakes + (state.food, power_ups, winner)
+
+
+class _NoHeadToHeadState(MatchState):
+    """Deliberately broken rules: a head-on crash only kills snake 1"""
+
+    __slots__ = ()
+
+    def _check_collisions(self):
+        snake1, snake2 = self.snakes
+        if snake1.alive and snake2.alive and snake1.head == snake2.head:
+            snake1.alive = False
+            return
+        super()._check_collisions()
+
+
+class InjectedBugEngine(MatchStateEngine):
+    """MatchStateEngine with a known bug, for checking the harness catches and shrinks it"""
+
+    state_class = _NoHeadToHeadState
+
+
+def new_reference(game, seed: int, walls: bool) -> ReferenceEngine:
+    """Start a seeded match on the game and wrap it as the reference"""
+    # The previous match's engine is still hooked into the game; seed food the usual way
+    vars(game).pop("respawn_food_safely", None)
+    game.walls = walls
+    game.now = 0
+    game.start_game(seed)
+    return ReferenceEngine(game)
+
+
+def random_input(rng: random.Random, reference: ReferenceEngine, grow: bool = False) -> TickInput:
+    """Random turns and spawns, biased towards heads and food so crashes and meals happen often.
+
+    With grow, snakes chase food and dodge every crash they can, food lands
+    next to a head and Grow power-ups are common, so bodies get long.
+    """
+    game = reference.game
+    board = game.board
+    snakes = (game.snake1, game.snake2)
+    heads = [snake.body.cell_at(0) for snake in snakes]
+    food = to_cell(game.food.x, game.food.y)
+    obstacles = {to_cell(obs.x, obs.y) for obs in game.obstacles}
+
+    def free(cell: int) -> bool:
+        return cell != WALL and cell not in obstacles and \
+            not any(snake.body.contains_cell(cell) for snake in snakes)
+
+    def room(cell: int, limit: int) -> int:
+        """Free cells reachable from cell, counting no further than limit"""
+        seen, frontier = {cell}, [cell]
+        while frontier and len(seen) < limit:
+            for neighbor in board.next_cell[frontier.pop()]:
+                if neighbor not in seen and free(neighbor):
+                    seen.add(neighbor)
+                    frontier.append(neighbor)
+        return len(seen)
+
+    def towards(head: int, target: int) -> int:
+        (x, y), (tx, ty) = from_cell(head), from_cell(target)
+        if x != tx and (y == ty or rng.random() < 0.5):
+            return 3 if tx > x else 2
+        return 1 if ty > y else 0
+
+    turns = []
+    for snake, head, other in ((snakes[0], heads[0], heads[1]), (snakes[1], heads[1], heads[0])):
+        roll = rng.random()
+        if grow:
+            turn = towards(head, food) if roll < 0.8 else None
+        elif roll < 0.1:
+            turn = rng.randrange(4)
+        elif roll < 0.25:
+            # Steer at the other head to provoke head-to-head and body crashes
+            turn = towards(head, other)
+        elif roll < 0.6:
+            turn = towards(head, food)
+        else:
+            turn = None
+        # Mostly dodge certain death, so matches last long enough to grow. The
+        # game ignores a reversal (DIRECTIONS come in opposite pairs, so i ^ 1)
+        # and the snake carries straight on, so that is the cell to check
+        current = DIRECTION_INDEX[snake.direction]
+        heading = current if turn is None or turn == current ^ 1 else turn
+        ahead = board.next_cell[head][heading]
+        safe = [i for i in range(4) if i != current ^ 1 and free(board.next_cell[head][i])]
+        if grow and safe:
+            # Growing snakes mostly die in their own coils or head-on over the food,
+            # so keep the heading only if no other move avoids more of that
+            contested = set(board.next_cell[other])
+            limit = len(snake.body) + 1
+
+            def outlook(i: int) -> Tuple[bool, bool]:
+                cell = board.next_cell[head][i]
+                return cell not in contested, room(cell, limit) >= limit
+
+            best = max(safe, key=outlook)
+            if heading not in safe or outlook(heading) < outlook(best):
+                turn = best
+        elif not free(ahead) and rng.random() < 0.9:
+            turn = rng.choice(safe) if safe else turn
+        turns.append(turn)
+
+    def near_a_head(adjacent: float) -> int:
+        for _ in range(20):
+            cell = board.next_cell[rng.choice(heads)][rng.randrange(4)] if rng.random() < adjacent \
+                else rng.randrange(NUM_CELLS)
+            if free(cell):
+                return cell
+        return rng.randrange(NUM_CELLS)
+
+    # Spawns the game would not make are dropped by ReferenceEngine.step. Growing
+    # snakes find food in front of them; their power-ups land further off, since
+    # a one-segment snake that takes Grow stacks its tail on its head and dies
+    powerup = None
+    if rng.random() < (0.2 if grow else 0.05):
+        kind = POWERUP_TYPES.index(PowerUpType.GROW) if grow and rng.random() < 0.7 \
+            else rng.randrange(len(POWERUP_TYPES))
+        powerup = (near_a_head(0.2 if grow else 0.5), kind)
+    return (turns[0], turns[1], near_a_head(0.9 if grow else 0.5), powerup)
+
+
+def replay(game, seed: int, walls: bool, log: Sequence[TickInput],
+           candidate_factory: Callable) -> Optional[Tuple[int, Tuple, Tuple]]:
+    """Run a log through both engines; return (tick, reference, candidate) at the first mismatch"""
+    reference = new_reference(game, seed, walls)
+    candidate = candidate_factory(game)
+    expected, actual = reference.observe(), candidate.observe()
+    if expected != actual:
+        return (-1, expected, actual)
+    for tick, tick_input in enumerate(log):
+        if reference.over:
+            break
+        candidate.step(reference.step(tick_input))
+        expected, actual = reference.observe(), candidate.observe()
+        if expected != actual:
+            return (tick, expected, actual)
+    return None
+
+
+def shrink(game, seed: int, walls: bool, log: List[TickInput],
+           candidate_factory: Callable) -> List[TickInput]:
+    """Cut a diverging log down to a minimal one that still diverges"""
+    def diverges(trial: List[TickInput]) -> Optional[List[TickInput]]:
+        found = replay(game, seed, walls, trial, candidate_factory)
+        return trial[:found[0] + 1] if found else None
+
+    log = diverges(log) or log
+
+    # Drop ever smaller chunks of ticks while the divergence survives
+    chunk = max(1, len(log) // 2)
+    while True:
+        start, removed = 0, False
+        while start < len(log):
+            trial = diverges(log[:start] + log[start + chunk:])
+            if trial is not None:
+                log, removed = trial, True
+            else:
+                start += chunk
+        if chunk == 1 and not removed:
+            break
+        chunk = max(1, chunk // 2)
+
+    # Then simplify what is left of each tick: no power-up, no turns
+    i = 0
+    while i < len(log):
+        for field in (3, 0, 1):
+            if log[i][field] is not None:
+                trial = diverges(log[:i] + [log[i][:field] + (None,) + log[i][field + 1:]] + log[i + 1:])
+                if trial is not None and len(trial) > i:
+                    log = trial
+        i += 1
+    return log
+
+
+def check_seeds(game, seeds: Sequence[int], max_ticks: int, tick_budget: int,
+                candidate_factory: Callable, grow: bool = False) -> Dict:
+    """Play random matches until the tick budget is spent or a divergence turns up"""
+    stats = {"ticks": 0, "matches": 0, "meals": 0, "powerups": 0, "head_to_head": 0,
+             "self_crashes": 0, "snake_crashes": 0, "obstacle_crashes": 0, "wall_crashes": 0,
+             "longest_snake": 0, "divergence": None}
+    for seed in seeds:
+        if stats["ticks"] >= tick_budget:
+            break
+        walls = seed % 2 == 1
+        rng = random.Random(seed)
+        reference = new_reference(game, seed, walls)
+        candidate = candidate_factory(game)
+        log: List[TickInput] = []
+        mismatch = reference.observe() != candidate.observe()
+        while not mismatch and not reference.over and len(log) < max_ticks:
+            tick_input = random_input(rng, reference, grow)
+            log.append(tick_input)
+            candidate.step(reference.step(tick_input))
+            stats["meals"] += reference.respawns
+            mismatch = reference.observe() != candidate.observe()
+
+        stats["ticks"] += len(log)
+        stats["matches"] += 1
+        stats["powerups"] += reference.powerups_collected
+        for snake in (game.snake1, game.snake2):
+            stats["longest_snake"] = max(stats["longest_snake"], len(snake.body))
+            reason = snake.death_reason
+            for key, text in (("head_to_head", "head-to-head"), ("self_crashes", "themselves"),
+                              ("obstacle_crashes", "obstacle"), ("wall_crashes", "wall")):
+                if text in reason:
+                    stats[key] += 1
+                    break
+            else:
+                if reason:
+                    stats["snake_crashes"] += 1
+
+        if mismatch:
+            stats["divergence"] = {"seed": seed, "walls": walls, "log": log}
+            break
+    return stats
+
+
+def minimize(game, divergence: Dict, candidate_factory: Callable) -> Dict:
+    """Shrink a divergence found by check_seeds and describe the mismatch it leaves"""
+    seed, walls, log = divergence["seed"], divergence["walls"], divergence["log"]
+    minimal = shrink(game, seed, walls, log, candidate_factory)
+    tick, expected, actual = replay(game, seed, walls, minimal, candidate_factory)
+    return {"seed": seed, "walls": walls, "tick": tick, "found_after": len(log),
+            "log": minimal, "reference": expected, "candidate": actual}
+
+
+def load_candidate(spec: str) -> Callable:
+    """Resolve 'package.module:Class' to a candidate engine factory"""
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def load_repro(path: str) -> Tuple[int, bool, List[TickInput]]:
+    """Read a --repro file back as (seed, walls, log)"""
+    with open(path) as f:
+        repro = json.load(f)
+    log = [(turn1, turn2, food, tuple(powerup) if powerup else None)
+           for turn1, turn2, food, powerup in repro["log"]]
+    return repro["seed"], repro["walls"], log
+
+
+def _check_job(job: Tuple) -> Dict:
+    seeds, max_ticks, tick_budget, candidate, grow = job
+    return check_seeds(worker_game(), seeds, max_ticks, tick_budget, load_candidate(candidate), grow)
+
+
+def run_conformance(ticks: int = 1_000_000, candidate: str = "game.conformance:MatchStateEngine",
+                    max_ticks: int = 1000, workers: Optional[int] = None, seed: int = 0,
+                    grow: bool = False) -> Dict:
+    """Spread seeded matches over a process pool until about `ticks` ticks have been compared"""
+    workers = workers or os.cpu_count()
+    # Small jobs keep every worker busy; each job stops at its share of the ticks
+    jobs_count = workers * 8
+    per_job = -(-ticks // jobs_count)
+    jobs = [(range(seed + i, seed + 10**9, jobs_count), max_ticks, per_job, candidate, grow)
+            for i in range(jobs_count)]
+
+    start = time.perf_counter()
+    totals: Dict = {}
+    divergences = []
+    for stats in map_on_workers(_check_job, jobs, workers):
+        divergence = stats.pop("divergence")
+        if divergence:
+            divergences.append(divergence)
+        for key, value in stats.items():
+            totals[key] = max(totals.get(key, 0), value) if key == "longest_snake" \
+                else totals.get(key, 0) + value
+
+    elapsed = time.perf_counter() - start
+    totals["ticks_per_second"] = totals["ticks"] / elapsed
+    totals["divergences"] = len(divergences)
+    if divergences:
+        # Shrinking replays the log many times, so only do it for the shortest few finds
+        shortest = sorted(divergences, key=lambda d: len(d["log"]))[:SHRINK_CANDIDATES]
+        start = time.perf_counter()
+        minimal = [minimize(worker_game(), found, load_candidate(candidate)) for found in shortest]
+        totals["first_divergence"] = min(minimal, key=lambda d: len(d["log"]))
+        totals["shrink_seconds"] = time.perf_counter() - start
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare a candidate rules engine with the Game rules")
+    parser.add_argument("--ticks", type=int, default=1_000_000, help="Total ticks to compare")
+    parser.add_argument("--candidate", default="game.conformance:MatchStateEngine",
+                        help="Candidate engine as module:Class")
+    parser.add_argument("--inject-bug", action="store_true",
+                        help="Use a candidate with a known head-to-head bug to check shrinking")
+    parser.add_argument("--max-ticks", type=int, default=1000, help="Longest match before moving on")
+    parser.add_argument("--grow", action="store_true",
+                        help="Feed the snakes instead of provoking crashes, to test long bodies")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repro", default=None, help="Write the minimal diverging input log here (JSON)")
+    parser.add_argument("--replay", default=None, help="Replay a --repro file instead of searching")
+    args = parser.parse_args()
+
+    candidate = "game.conformance:InjectedBugEngine" if args.inject_bug else args.candidate
+    if args.replay:
+        seed, walls, log = load_repro(args.replay)
+        found = replay(worker_game(), seed, walls, log, load_candidate(candidate))
+        if found is None:
+            print(f"{len(log)} ticks replayed, no divergence")
+            sys.exit(0)
+        tick, expected, actual = found
+        print(f"Divergence at tick {tick}\n  reference: {expected}\n  candidate: {actual}")
+        sys.exit(1)
+
+    report = run_conformance(args.ticks, candidate, args.max_ticks, args.workers, args.seed, args.grow)
+    divergence = report.pop("first_divergence", None)
+    print_report(report, precision=1)
+
+    if divergence:
+        print(f"\nDivergence: seed {divergence['seed']}, walls={divergence['walls']}, "
+              f"tick {divergence['tick']} of a {len(divergence['log'])}-tick minimal log "
+              f"(found after {divergence['found_after']} ticks)")
+        print(f"  reference: {divergence['reference']}")
+        print(f"  candidate: {divergence['candidate']}")
+        for tick, tick_input in enumerate(divergence["log"]):
+            print(f"  {tick:4d}: {tick_input}")
+        if args.repro:
+            with open(args.repro, "w") as f:
+                json.dump({key: divergence[key] for key in ("seed", "walls", "log")}, f)
+        sys.exit(1)
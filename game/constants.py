@@ -5,6 +5,10 @@ GRID_SIZE = 20
 GRID_WIDTH = WINDOW_WIDTH // GRID_SIZE
 GRID_HEIGHT = WINDOW_HEIGHT // GRID_SIZE
 
+# Game.winner text to winner id, as match history, ratings and the conformance harness count it
+TIE = 0
+WINNERS = {"Player 1 (Green)": 1, "Player 2 (Blue)": 2, "Tie": TIE}
+
 # Colors
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -0,0 +1,69 @@
+import pygame
+from collections import deque
+from typing import Dict, Optional, Tuple
+from .enums import Direction
+from .metrics import REGISTRY
+
+INPUT_LATENCY = REGISTRY.histogram("input_latency_ms", "Time from key press to the move that applied it",
+                                   buckets=(8, 16, 33, 50, 75, 100, 150, 200, 300, 500))
+
+# Key -> (player number, direction)
+KEY_BINDINGS: Dict[int, Tuple[int, Direction]] = {
+    # Player 1 controls (Arrow keys)
+    pygame.K_UP: (1, Direction.UP),
+    pygame.K_DOWN: (1, Direction.DOWN),
+    pygame.K_LEFT: (1, Direction.LEFT),
+    pygame.K_RIGHT: (1, Direction.RIGHT),
+    # Player 2 controls (WASD)
+    pygame.K_w: (2, Direction.UP),
+    pygame.K_s: (2, Direction.DOWN),
+    pygame.K_a: (2, Direction.LEFT),
+    pygame.K_d: (2, Direction.RIGHT),
+}
+
+
+def is_reverse(a: Direction, b: Direction) -> bool:
+    ax, ay = a.value
+    bx, by = b.value
+    return (ax, ay) == (-bx, -by)
+
+
+def event_time(event: pygame.event.Event, received: int) -> int:
+    """When the key was pressed: the event's own SDL timestamp where pygame
+    exposes one, otherwise the time it was taken off the event queue"""
+    return getattr(event, "timestamp", received)
+
+
+class InputQueue:
+    """Buffered turns for one player, applied one per movement tick.
+
+    Turns are validated against the last queued direction rather than the
+    snake's current one, so a quick UP-then-LEFT inside one movement
+    interval becomes two consecutive turns instead of a lost keypress.
+    """
+
+    def __init__(self, max_turns: int = 3):
+        self.turns = deque()  # (direction, timestamp when pressed)
+        self.max_turns = max_turns
+
+    def push(self, direction: Direction, current_direction: Direction, timestamp: int) -> bool:
+        """Queue a turn, returning False if it was redundant, a reversal or overflowed"""
+        last = self.turns[-1][0] if self.turns else current_direction
+        if direction == last or is_reverse(direction, last):
+            return False
+        if len(self.turns) >= self.max_turns:
+            return False
+        self.turns.append((direction, timestamp))
+        return True
+
+    def apply_next(self, snake, current_time: int) -> Optional[Direction]:
+        """Apply the oldest buffered turn to the snake before it moves"""
+        if not self.turns:
+            return None
+        direction, timestamp = self.turns.popleft()
+        snake.change_direction(direction)
+        INPUT_LATENCY.observe(current_time - timestamp)
+        return direction
+
+    def clear(self):
+        self.turns.clear()
@@ -0,0 +1,155 @@
+import random
+from array import array
+from typing import Iterable, Iterator, List, Tuple, Union
+from ..grid import NUM_CELLS, POSITIONS, to_cell
+
+# One random 64-bit key per cell; a body's digest is the sum of its cells' keys
+ZOBRIST_KEYS = array("Q", (random.Random(0x5EED).getrandbits(64) for _ in range(NUM_CELLS)))
+DIGEST_MASK = (1 << 64) - 1
+
+
+class SnakeBody:
+    """Snake segments as encoded cells in an array('H') ring buffer.
+
+    Index 0 is the head. Moving pushes a head and pops the tail in O(1)
+    without shifting, and each segment costs two bytes instead of a tuple.
+    Indexing, iteration and ``in`` still speak (x, y) tuples so drawing and
+    collision code can treat it like the old list of positions; the tuples
+    come from the shared POSITIONS table, so none are built per call.
+    Hot paths that only compare cells should use advance, cell_at,
+    contains_cell and iter_cells and skip decoding altogether.
+
+    ``digest`` is a Zobrist-style sum over the occupied cells, kept up to
+    date by every push and pop so hashing a body for desync checks is O(1).
+    """
+
+    __slots__ = ("cells", "head_index", "length", "digest")
+
+    def __init__(self, segments: Iterable[Tuple[int, int]] = (), capacity: int = 16):
+        self._load(array("H", [to_cell(x, y) for x, y in segments]), capacity)
+    
+    @classmethod
+    def from_cells(cls, cells: Iterable[int], capacity: int = 16) -> 'SnakeBody':
+        """Build from head-first encoded cells"""
+        body = cls.__new__(cls)
+        body._load(array("H", cells), capacity)
+        return body
+    
+    def _load(self, cells: array, capacity: int):
+        self.cells = cells + array("H", bytes(2 * max(0, capacity - len(cells))))
+        self.head_index = 0
+        self.length = len(cells)
+        self.digest = sum(map(ZOBRIST_KEYS.__getitem__, cells)) & DIGEST_MASK
+
+    def _grow_capacity(self):
+        ordered = self.cell_list()
+        self.cells = array("H", ordered) + array("H", bytes(2 * max(16, len(self.cells))))
+        self.head_index = 0
+
+    def push_head(self, cell: int):
+        if self.length == len(self.cells):
+            self._grow_capacity()
+        self.head_index = (self.head_index or len(self.cells)) - 1
+        self.cells[self.head_index] = cell
+        self.length += 1
+        self.digest = (self.digest + ZOBRIST_KEYS[cell]) & DIGEST_MASK
+
+    def pop_tail(self) -> int:
+        self.length -= 1
+        cell = self.cells[(self.head_index + self.length) % len(self.cells)]
+        self.digest = (self.digest - ZOBRIST_KEYS[cell]) & DIGEST_MASK
+        return cell
+
+    def advance(self, cell: int) -> int:
+        """Push a head and pop the tail in one step (a move without growing); returns the old tail"""
+        cells = self.cells
+        head_index = self.head_index
+        tail_index = head_index + self.length - 1
+        if tail_index >= len(cells):
+            tail_index -= len(cells)
+        # Read the tail first: in a full buffer the new head takes its slot
+        tail = cells[tail_index]
+        head_index = (head_index or len(cells)) - 1
+        cells[head_index] = cell
+        self.head_index = head_index
+        self.digest = (self.digest + ZOBRIST_KEYS[cell] - ZOBRIST_KEYS[tail]) & DIGEST_MASK
+        return tail
+
+    def append_tail(self, cell: int):
+        if self.length == len(self.cells):
+            self._grow_capacity()
+        self.cells[(self.head_index + self.length) % len(self.cells)] = cell
+        self.length += 1
+        self.digest = (self.digest + ZOBRIST_KEYS[cell]) & DIGEST_MASK
+
+    def cell_at(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("snake body index out of range")
+        return self.cells[(self.head_index + index) % len(self.cells)]
+
+    def iter_cells(self) -> Iterator[int]:
+        """Head-first encoded cells, for loops that never need (x, y)"""
+        return iter(self.cell_array())
+
+    def cell_list(self) -> List[int]:
+        """Head-first encoded cells"""
+        return self.cell_array().tolist()
+    
+    def cell_array(self) -> array:
+        """Head-first encoded cells as a fresh array('H')"""
+        end = self.head_index + self.length
+        if end <= len(self.cells):
+            return self.cells[self.head_index:end]
+        return self.cells[self.head_index:] + self.cells[:end - len(self.cells)]
+
+    def contains_cell(self, cell: int, start: int = 0) -> bool:
+        """Whether cell occurs at logical index start or later, without copying"""
+        if start >= self.length:
+            return False
+        capacity = len(self.cells)
+        first = self.head_index + start
+        end = self.head_index + self.length
+        spans = []
+        if first >= capacity:
+            spans.append((first - capacity, end - capacity))
+        elif end > capacity:
+            spans += [(first, capacity), (0, end - capacity)]
+        else:
+            spans.append((first, end))
+        for lo, hi in spans:
+            try:
+                self.cells.index(cell, lo, hi)
+                return True
+            except ValueError:
+                pass
+        return False
+
+    # Compatibility with the list-of-tuples representation
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return map(POSITIONS.__getitem__, self.cell_array())
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [POSITIONS[cell] for cell in self.cell_array()[index]]
+        return POSITIONS[self.cell_at(index)]
+
+    def __contains__(self, position: Union[int, Tuple[int, int]]) -> bool:
+        cell = position if isinstance(position, int) else to_cell(*position)
+        return self.contains_cell(cell)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SnakeBody):
+            return self.cell_list() == other.cell_list()
+        try:
+            return list(self) == [tuple(segment) for segment in other]
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SnakeBody({list(self)!r})"
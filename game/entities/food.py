@@ -4,15 +4,17 @@ from typing import Tuple
 from ..constants import *
 
 class Food:
-    def __init__(self):
+    __slots__ = ("x", "y", "color")
+    
+    def __init__(self, rng: random.Random = random):
         self.x = 0
         self.y = 0
         self.color = RED
-        self.respawn()
+        self.respawn(rng)
     
-    def respawn(self):
-        self.x = random.randint(0, GRID_WIDTH - 1)
-        self.y = random.randint(0, GRID_HEIGHT - 1)
+    def respawn(self, rng: random.Random = random):
+        self.x = rng.randint(0, GRID_WIDTH - 1)
+        self.y = rng.randint(0, GRID_HEIGHT - 1)
     
     def get_position(self) -> Tuple[int, int]:
         return (self.x, self.y)
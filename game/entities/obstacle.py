@@ -3,6 +3,8 @@ from typing import Tuple
 from ..constants import *
 
 class Obstacle:
+    __slots__ = ("x", "y", "color")
+    
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -1,11 +1,16 @@
 import pygame
 import random
-from typing import Tuple
+from typing import Optional, Tuple
 from ..enums import PowerUpType
 from ..constants import *
 
+# Fixed order for encoding a power-up type as a small int (snapshots, hashes, input logs)
+POWERUP_TYPES = tuple(PowerUpType)
+
 class PowerUp:
-    def __init__(self, power_type: PowerUpType):
+    __slots__ = ("x", "y", "power_type", "duration", "color")
+    
+    def __init__(self, power_type: PowerUpType, rng: random.Random = random):
         self.x = 0
         self.y = 0
         self.power_type = power_type
@@ -19,18 +24,28 @@ class PowerUp:
         elif power_type == PowerUpType.SHRINK_OPPONENT:
             self.color = ORANGE
         
-        self.respawn()
+        self.respawn(rng)
     
-    def respawn(self):
-        self.x = random.randint(0, GRID_WIDTH - 1)
-        self.y = random.randint(0, GRID_HEIGHT - 1)
+    def respawn(self, rng: random.Random = random):
+        self.x = rng.randint(0, GRID_WIDTH - 1)
+        self.y = rng.randint(0, GRID_HEIGHT - 1)
     
     def get_position(self) -> Tuple[int, int]:
         return (self.x, self.y)
     
-    def draw(self, screen: pygame.Surface):
+    def appearance(self, now: int) -> int:
+        """Pulse phase at this time"""
+        return int(now / 200) % 2
+    
+    def next_appearance_change(self, now: int) -> Optional[int]:
+        return (now // 200 + 1) * 200
+    
+    def bounds(self) -> pygame.Rect:
+        return pygame.Rect(self.x * GRID_SIZE, self.y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+    
+    def draw(self, screen: pygame.Surface, now: int):
         # Draw power-up with a pulsing effect
-        pulse = int(pygame.time.get_ticks() / 200) % 2
+        pulse = self.appearance(now)
         size = GRID_SIZE if pulse else GRID_SIZE - 4
         offset = (GRID_SIZE - size) // 2
         pygame.draw.rect(screen, self.color, 
@@ -1,11 +1,21 @@
 import pygame
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from ..enums import Direction
 from ..constants import *
+from ..controls import is_reverse
+from ..grid import DIRECTION_INDEX, WALL, Board, get_board
+from .body import SnakeBody
 
 class Snake:
-    def __init__(self, start_x: int, start_y: int, color: Tuple[int, int, int], player_id: int):
-        self.body = [(start_x, start_y)]
+    __slots__ = ("_body", "direction", "color", "player_id", "score", "speed_boost_end",
+                 "alive", "death_time", "death_reason", "head_color", "dead_color", "board",
+                 "hit_wall")
+    
+    def __init__(self, start_x: int, start_y: int, color: Tuple[int, int, int], player_id: int,
+                 board: Optional[Board] = None):
+        self._body = SnakeBody([(start_x, start_y)])
+        self.board = board or get_board()
+        self.hit_wall = False
         self.direction = Direction.RIGHT
         self.color = color
         self.player_id = player_id
@@ -15,52 +25,54 @@ class Snake:
         self.death_time = 0
         self.death_reason = ""
         
+        # Colors never change, so work them out once rather than per segment per frame
+        self.head_color = tuple(min(255, c + 50) for c in color)
+        self.dead_color = tuple(max(0, c - 100) for c in color)
+    
+    @property
+    def body(self) -> SnakeBody:
+        return self._body
+    
+    @body.setter
+    def body(self, segments):
+        self._body = segments if isinstance(segments, SnakeBody) else SnakeBody(segments)
+        
     def move(self, grow: bool = False):
         """Move the snake, optionally growing"""
         if not self.alive:
             return
             
-        head_x, head_y = self.body[0]
-        dx, dy = self.direction.value
-        new_x = head_x + dx
-        new_y = head_y + dy
-        
-        # Wrap around walls (teleport to opposite side)
-        if new_x < 0:
-            new_x = GRID_WIDTH - 1
-        elif new_x >= GRID_WIDTH:
-            new_x = 0
-            
-        if new_y < 0:
-            new_y = GRID_HEIGHT - 1
-        elif new_y >= GRID_HEIGHT:
-            new_y = 0
-        
-        # Add new head
-        self.body.insert(0, (new_x, new_y))
+        # The board's table handles wrapping (or walls) at the edges
+        new_cell = self.next_cell()
+        if new_cell == WALL:
+            self.hit_wall = True
+            return
         
-        # Only remove tail if not growing
-        if not grow:
-            self.body.pop()
+        # Add new head, and only remove the tail if not growing
+        if grow:
+            self._body.push_head(new_cell)
+        else:
+            self._body.advance(new_cell)
     
     def get_head(self) -> Tuple[int, int]:
         return self.body[0] if self.body else (0, 0)
     
+    def next_cell(self) -> int:
+        """Encoded cell the head moves into next (WALL off the edge of a walled board)"""
+        return self.board.next_cell[self._body.cell_at(0)][DIRECTION_INDEX[self.direction]]
+    
     def change_direction(self, new_direction: Direction):
         # Prevent moving in the opposite direction
-        current_dx, current_dy = self.direction.value
-        new_dx, new_dy = new_direction.value
-        
-        if (current_dx, current_dy) != (-new_dx, -new_dy):
+        if not is_reverse(new_direction, self.direction):
             self.direction = new_direction
     
     def check_self_collision(self) -> bool:
-        head = self.get_head()
-        return head in self.body[1:]
+        if not self._body:
+            return False
+        return self._body.contains_cell(self._body.cell_at(0), start=1)
     
     def check_collision_with_snake(self, other_snake: 'Snake') -> bool:
-        head = self.get_head()
-        return head in other_snake.body
+        return bool(self._body) and other_snake.body.contains_cell(self._body.cell_at(0))
     
     def check_collision_with_obstacles(self, obstacles: List['Obstacle']) -> bool:
         head = self.get_head()
@@ -71,9 +83,9 @@ class Snake:
         if not self.body:
             return
             
-        tail = self.body[-1]
+        tail = self._body.cell_at(-1)
         for _ in range(segments):
-            self.body.append(tail)
+            self._body.append_tail(tail)
     
     def shrink(self, segments: int = 1):
         """Shrink the snake by removing segments from the tail"""
@@ -81,45 +93,73 @@ class Snake:
             return
             
         for _ in range(min(segments, len(self.body) - 1)):
-            self.body.pop()
+            self._body.pop_tail()
     
-    def apply_speed_boost(self, duration: int = 3000):
-        self.speed_boost_end = pygame.time.get_ticks() + duration
+    def apply_speed_boost(self, now: int, duration: int = 3000):
+        self.speed_boost_end = now + duration
     
-    def has_speed_boost(self) -> bool:
-        return pygame.time.get_ticks() < self.speed_boost_end
+    def has_speed_boost(self, now: int) -> bool:
+        return now < self.speed_boost_end
     
-    def kill(self, reason: str):
+    def kill(self, reason: str, now: int):
         """Kill the snake with a specific reason"""
         if self.alive:
             self.alive = False
-            self.death_time = pygame.time.get_ticks()
+            self.death_time = now
             self.death_reason = reason
     
-    def draw(self, screen: pygame.Surface):
-        # Determine if snake should be visible (blinking effect when dead)
-        visible = True
+    def blink_interval(self, now: int) -> int:
+        """Dead snakes blink fast for the first 2 seconds, then slower"""
+        time_since_death = now - self.death_time
+        if time_since_death < 2000:  # First 2 seconds - fast blink
+            return 150
+        elif time_since_death < 4000:  # Next 2 seconds - slower blink
+            return 300
+        return 500  # After 4 seconds - very slow blink
+    
+    def appearance(self, now: int) -> Tuple[bool, Tuple[int, int, int]]:
+        """Whether the snake is visible at this time, and its body color"""
         if not self.alive:
-            # Blinking effect - faster blinking for first 2 seconds, then slower
-            time_since_death = pygame.time.get_ticks() - self.death_time
-            if time_since_death < 2000:  # First 2 seconds - fast blink
-                visible = (pygame.time.get_ticks() // 150) % 2 == 0
-            elif time_since_death < 4000:  # Next 2 seconds - slower blink  
-                visible = (pygame.time.get_ticks() // 300) % 2 == 0
-            else:  # After 4 seconds - very slow blink
-                visible = (pygame.time.get_ticks() // 500) % 2 == 0
+            # Blinking effect, dim body when dead
+            return (now // self.blink_interval(now)) % 2 == 0, self.dead_color
         
+        # Add glowing effect during speed boost
+        if self.has_speed_boost(now):
+            glow = int(now / 100) % 50
+            return True, tuple(min(255, c + glow) for c in self.color)
+        return True, self.color
+    
+    def next_appearance_change(self, now: int) -> Optional[int]:
+        """Time the blink or glow next changes, or None if the snake looks the same from now on"""
+        if not self.alive:
+            interval = self.blink_interval(now)
+            change = (now // interval + 1) * interval
+            for phase_end in (self.death_time + 2000, self.death_time + 4000):
+                if now < phase_end:
+                    return min(change, phase_end)
+            return change
+        if self.has_speed_boost(now):
+            return min((now // 100 + 1) * 100, self.speed_boost_end)
+        return None
+    
+    def bounds(self) -> pygame.Rect:
+        """Screen area covered by the body"""
+        xs = [x for x, _ in self.body]
+        ys = [y for _, y in self.body]
+        return pygame.Rect(min(xs) * GRID_SIZE, min(ys) * GRID_SIZE,
+                           (max(xs) - min(xs) + 1) * GRID_SIZE, (max(ys) - min(ys) + 1) * GRID_SIZE)
+    
+    def draw(self, screen: pygame.Surface, now: int):
+        # Body color is the same for every segment this frame
+        visible, body_color = self.appearance(now)
         if not visible:
             return
-            
+        
         # Draw body
         for i, (x, y) in enumerate(self.body):
             if i == 0:  # Head
                 # Make head brighter, or dim if dead
-                if self.alive:
-                    head_color = tuple(min(255, c + 50) for c in self.color)
-                else:
-                    head_color = tuple(max(0, c - 100) for c in self.color)  # Dim when dead
+                head_color = self.head_color if self.alive else self.dead_color  # Dim when dead
                 
                 pygame.draw.rect(screen, head_color, 
                                (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))
@@ -146,15 +186,5 @@ class Snake:
                                    (x * GRID_SIZE + GRID_SIZE - 3, y * GRID_SIZE + 3),
                                    (x * GRID_SIZE + GRID_SIZE - 9, y * GRID_SIZE + 9), 2)
             else:  # Body
-                if self.alive:
-                    body_color = self.color
-                    # Add glowing effect during speed boost
-                    if self.has_speed_boost():
-                        glow = int(pygame.time.get_ticks() / 100) % 50
-                        body_color = tuple(min(255, c + glow) for c in self.color)
-                else:
-                    # Dim body when dead
-                    body_color = tuple(max(0, c - 100) for c in self.color)
-                
                 pygame.draw.rect(screen, body_color, 
                                (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)) 
\ No newline at end of file
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+from typing import Optional
+
+
+def write_atomically(path: str, data: bytes):
+    """Replace path with data so readers only ever see the old or the new file"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself survive a power cut
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+class LatestWriter:
+    """Writes the latest submitted bytes to a file from a background thread.
+
+    submit() only swaps in the new data; if the disk is slower than the
+    submissions, older unwritten ones are skipped rather than queued. A
+    failed write is counted and reported, and the next submission is tried
+    as usual.
+    """
+
+    def __init__(self, path: str, name: str = "file-writer", label: str = "Save"):
+        self.path = path
+        self.label = label
+        self.pending: Optional[bytes] = None
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.writes = 0
+        self.failed_writes = 0
+        self.writer = threading.Thread(target=self._write_loop, name=name, daemon=True)
+        self.writer.start()
+
+    def submit(self, data: bytes):
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def close(self):
+        """Write whatever is still pending, then stop"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.writer.join()
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopping:
+                    self.condition.wait()
+                data, self.pending = self.pending, None
+                stopping = self.stopping
+            if data is not None:
+                try:
+                    write_atomically(self.path, data)
+                    self.writes += 1
+                except Exception as e:
+                    # Skip this write, not the writer: the next one may well succeed
+                    self.failed_writes += 1
+                    print(f"{self.label}: could not write {self.path}: {e}", file=sys.stderr)
+            if stopping and data is None:
+                return
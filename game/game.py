@@ -1,15 +1,67 @@
 import pygame
 import random
+import struct
 import sys
-from typing import List
-from .enums import Direction, PowerUpType, GameState
+import time
+import zlib
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .enums import PowerUpType, GameState
 from .constants import *
+from .controls import KEY_BINDINGS, InputQueue, event_time
 from .entities import Snake, Food, PowerUp, Obstacle
+from .entities.powerup import POWERUP_TYPES
+from .grid import DIRECTION_INDEX, get_board, to_cell
+from .metrics import REGISTRY
+from .simulation import MatchState
+from .snapshot import encode_snapshot
+
+# Runtime metrics
+FRAME_TIME = REGISTRY.histogram("frame_time_ms", "Logic, broadcast and drawing time per frame")
+FPS = REGISTRY.gauge("fps", "Frames per second averaged by the pygame clock")
+TICKS = REGISTRY.counter("ticks", "Snake movement ticks simulated")
+FOOD_SPAWN_RETRIES = REGISTRY.counter("food_spawn_retries", "Rejected food spawn positions")
+POWERUP_SPAWN_RETRIES = REGISTRY.counter("powerup_spawn_retries", "Rejected power-up spawn positions")
+COLLISION_CHECKS = REGISTRY.counter("collision_checks", "Deadly collision passes run")
+MATCHES_COMPLETED = REGISTRY.counter("matches_completed", "Matches that reached game over")
+SPECTATORS = REGISTRY.gauge("spectators", "Connected spectator subscribers")
+SNAPSHOT_TIME = REGISTRY.histogram("snapshot_encode_ms", "Time to encode an autosave snapshot")
+IDLE_WAKEUPS = REGISTRY.counter("idle_wakeups", "Wakeups for input or a blink on menu screens")
+
+# Timer event for the next blink while idling on a menu screen
+BLINK_EVENT = pygame.USEREVENT + 1
+# Where draw_ui puts each player's speed boost label
+BOOST_LABEL_POSITIONS = ((10, 50), (WINDOW_WIDTH - 150, 50))
+# Events after which the whole window has to be drawn again
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED)
+
+# Per-snake fields folded into state_hash(): body digest, head, length, direction,
+# score, alive, hit wall, remaining boost
+SNAKE_HASH_FORMAT = struct.Struct("!QHHBi??i")
+
+if TYPE_CHECKING:
+    from .bots import SearchBot
+    from .lockstep import LockstepPeer
+    from .matchmaking import EloRatings
+    from .snapshot import SnapshotWriter
+    from .spectator import SpectatorChannel
+    from .storage import MatchHistory
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption("Two-Player Snake Game")
+    def __init__(self, spectators: Optional['SpectatorChannel'] = None,
+                 history: Optional['MatchHistory'] = None,
+                 screen: Optional[pygame.Surface] = None,
+                 bots: Optional[Dict[int, 'SearchBot']] = None,
+                 walls: bool = False,
+                 seed: Optional[int] = None,
+                 snapshots: Optional['SnapshotWriter'] = None,
+                 snapshot_interval: int = 5000,
+                 ratings: Optional['EloRatings'] = None):
+        if screen is None:
+            self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+            pygame.display.set_caption("Two-Player Snake Game")
+        else:
+            # Offscreen rendering: draw into the caller's surface, no window
+            self.screen = screen
         self.clock = pygame.time.Clock()
         
         # Game state management
@@ -34,6 +86,15 @@ class Game:
         self.power_ups: List[PowerUp] = []
         self.obstacles: List[Obstacle] = []
         
+        # Board edges: wrap around by default, or deadly walls (applies from the next match)
+        self.walls = walls
+        self.board = get_board(wrap=not walls)
+        
+        # Rules randomness and time come from here, never the global random module or
+        # the wall clock, so peers fed the same seed and inputs stay in lockstep
+        self.rng = random.Random(seed)
+        self.now = pygame.time.get_ticks()
+        
         # Game state
         self.base_speed = 120  # Lower is faster
         self.game_over = False
@@ -41,6 +102,13 @@ class Game:
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
         self.large_font = pygame.font.Font(None, 48)
+        self.title_font = pygame.font.Font(None, 72)
+        self.game_over_layer = None
+        
+        # Idle menu drawing: full redraw pending, blinking areas as last drawn
+        self.idle_redraw = True
+        self.blink_keys = []
+        self.cursor_rect = None
         
         # Death effect timing
         self.death_delay = 3000  # 3 seconds delay before showing game over
@@ -49,19 +117,54 @@ class Game:
         # Power-up spawn timer
         self.last_powerup_spawn = 0
         self.powerup_spawn_interval = 8000  # 8 seconds
+        
+        # Buffered turns, one applied per movement tick
+        self.input1 = InputQueue()
+        self.input2 = InputQueue()
+        
+        # Search bots keyed by the player number they control
+        self.bots = bots or {}
+        
+        # Movement timers
+        self.last_move_time1 = self.now
+        self.last_move_time2 = self.now
+        
+        # Optional spectator broadcast channel
+        self.spectators = spectators
+        
+        # Optional persistent match history
+        self.history = history
+        
+        # Optional per-player Elo ratings, updated as each match ends
+        self.ratings = ratings
+        
+        # Optional peer-to-peer lockstep session driving update()
+        self.lockstep: Optional['LockstepPeer'] = None
+        
+        # Optional autosave of the whole match for resuming after a restart
+        self.snapshots = snapshots
+        self.snapshot_interval = snapshot_interval
+        self.last_snapshot = self.now
     
-    def initialize_game_objects(self):
+    def initialize_game_objects(self, seed: Optional[int] = None):
         """Initialize game objects when starting a new game"""
-        self.snake1 = Snake(5, GRID_HEIGHT // 2, DARK_GREEN, 1)
-        self.snake2 = Snake(GRID_WIDTH - 6, GRID_HEIGHT // 2, DARK_BLUE, 2)
-        self.food = Food()
+        if seed is not None:
+            self.rng.seed(seed)
+        self.board = get_board(wrap=not self.walls)
+        self.snake1 = Snake(5, GRID_HEIGHT // 2, DARK_GREEN, 1, self.board)
+        self.snake2 = Snake(GRID_WIDTH - 6, GRID_HEIGHT // 2, DARK_BLUE, 2, self.board)
+        self.food = Food(self.rng)
         self.power_ups = []
         self.obstacles = []
         
         # Game state reset
+        self.input1.clear()
+        self.input2.clear()
         self.game_over = False
         self.winner = None
-        self.last_powerup_spawn = pygame.time.get_ticks()
+        self.last_move_time1 = self.now
+        self.last_move_time2 = self.now
+        self.last_powerup_spawn = self.now
         
         # Generate obstacles and ensure safe food spawn
         self.generate_obstacles()
@@ -69,13 +172,13 @@ class Game:
     
     def generate_obstacles(self):
         """Generate random obstacles on the board"""
-        num_obstacles = random.randint(8, 15)
+        num_obstacles = self.rng.randint(8, 15)
         
         for _ in range(num_obstacles):
             max_attempts = 50
             for _ in range(max_attempts):
-                x = random.randint(2, GRID_WIDTH - 3)
-                y = random.randint(2, GRID_HEIGHT - 3)
+                x = self.rng.randint(2, GRID_WIDTH - 3)
+                y = self.rng.randint(2, GRID_HEIGHT - 3)
                 
                 # Make sure obstacles don't spawn on snakes' starting positions
                 if (x, y) not in [(5, GRID_HEIGHT // 2), (GRID_WIDTH - 6, GRID_HEIGHT // 2)]:
@@ -86,7 +189,7 @@ class Game:
         """Respawn food in a safe location away from obstacles and snakes"""
         max_attempts = 100
         for _ in range(max_attempts):
-            self.food.respawn()
+            self.food.respawn(self.rng)
             food_pos = self.food.get_position()
             
             # Check if position is safe
@@ -107,19 +210,20 @@ class Game:
             
             if safe:
                 break
+            FOOD_SPAWN_RETRIES.inc()
     
     def spawn_powerup(self):
         """Spawn a random power-up"""
         if len(self.power_ups) >= 2:  # Limit number of power-ups on screen
             return
             
-        power_type = random.choice(list(PowerUpType))
-        powerup = PowerUp(power_type)
+        power_type = self.rng.choice(list(PowerUpType))
+        powerup = PowerUp(power_type, self.rng)
         
         # Make sure power-up doesn't spawn on snakes, food, or obstacles
         max_attempts = 50
         for _ in range(max_attempts):
-            powerup.respawn()
+            powerup.respawn(self.rng)
             pu_pos = powerup.get_position()
             
             safe = True
@@ -131,50 +235,36 @@ class Game:
             
             if safe:
                 break
+            POWERUP_SPAWN_RETRIES.inc()
         
         self.power_ups.append(powerup)
     
-    def handle_input(self):
-        keys = pygame.key.get_pressed()
-        
-        # Player 1 controls (Arrow keys)
-        if keys[pygame.K_UP]:
-            self.snake1.change_direction(Direction.UP)
-        elif keys[pygame.K_DOWN]:
-            self.snake1.change_direction(Direction.DOWN)
-        elif keys[pygame.K_LEFT]:
-            self.snake1.change_direction(Direction.LEFT)
-        elif keys[pygame.K_RIGHT]:
-            self.snake1.change_direction(Direction.RIGHT)
-        
-        # Player 2 controls (WASD)
-        if keys[pygame.K_w]:
-            self.snake2.change_direction(Direction.UP)
-        elif keys[pygame.K_s]:
-            self.snake2.change_direction(Direction.DOWN)
-        elif keys[pygame.K_a]:
-            self.snake2.change_direction(Direction.LEFT)
-        elif keys[pygame.K_d]:
-            self.snake2.change_direction(Direction.RIGHT)
+    def handle_input(self, event: pygame.event.Event):
+        """Queue a turn from a KEYDOWN event for the player it belongs to"""
+        binding = KEY_BINDINGS.get(event.key)
+        if binding is None:
+            return
+        
+        player, direction = binding
+        pressed = event_time(event, pygame.time.get_ticks())
+        if player == 1:
+            self.input1.push(direction, self.snake1.direction, pressed)
+        else:
+            self.input2.push(direction, self.snake2.direction, pressed)
+    
+    def apply_bot_turn(self, player: int, current_time: int):
+        """Let a search bot pick the direction for its snake's next move"""
+        bot = self.bots.get(player)
+        if bot is None:
+            return
+        
+        snake = self.snake1 if player == 1 else self.snake2
+        if snake.alive:
+            snake.change_direction(bot.choose(MatchState.from_game(self, current_time)))
     
     def check_will_eat_food(self, snake: Snake) -> bool:
         """Check if snake will eat food on next move"""
-        head_x, head_y = snake.get_head()
-        dx, dy = snake.direction.value
-        new_x = head_x + dx
-        new_y = head_y + dy
-        
-        # Handle wall wrapping
-        if new_x < 0:
-            new_x = GRID_WIDTH - 1
-        elif new_x >= GRID_WIDTH:
-            new_x = 0
-        if new_y < 0:
-            new_y = GRID_HEIGHT - 1
-        elif new_y >= GRID_HEIGHT:
-            new_y = 0
-        
-        return (new_x, new_y) == self.food.get_position()
+        return snake.next_cell() == to_cell(self.food.x, self.food.y)
     
     def check_powerup_collisions(self):
         """Check if either snake collected a power-up"""
@@ -194,7 +284,7 @@ class Game:
             if snake_that_collected:
                 # Apply power-up effect
                 if powerup.power_type == PowerUpType.SPEED_BOOST:
-                    snake_that_collected.apply_speed_boost()
+                    snake_that_collected.apply_speed_boost(self.now)
                 elif powerup.power_type == PowerUpType.GROW:
                     snake_that_collected.grow(2)  # Grow by 2 segments
                 elif powerup.power_type == PowerUpType.SHRINK_OPPONENT:
@@ -205,50 +295,63 @@ class Game:
     
     def check_collisions(self):
         """Check all deadly collision scenarios"""
+        COLLISION_CHECKS.inc()
+        
         # Check self collisions
         if self.snake1.alive and self.snake1.check_self_collision():
-            self.snake1.kill(f"{self.player1_name} ran into themselves!")
+            self.snake1.kill(f"{self.player1_name} ran into themselves!", self.now)
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
                 
         if self.snake2.alive and self.snake2.check_self_collision():
-            self.snake2.kill(f"{self.player2_name} ran into themselves!")
+            self.snake2.kill(f"{self.player2_name} ran into themselves!", self.now)
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
         
         # Check for head-to-head collision FIRST (both snakes die)
         if (self.snake1.alive and self.snake2.alive and 
             self.snake1.get_head() == self.snake2.get_head()):
-            self.snake1.kill(f"{self.player1_name} collided head-to-head!")
-            self.snake2.kill(f"{self.player2_name} collided head-to-head!")
+            self.snake1.kill(f"{self.player1_name} collided head-to-head!", self.now)
+            self.snake2.kill(f"{self.player2_name} collided head-to-head!", self.now)
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
         
         # Check collisions between snakes (avoid head-to-head double-kill)
         elif self.snake1.alive and self.snake1.check_collision_with_snake(self.snake2):
-            self.snake1.kill(f"{self.player1_name} ran into {self.player2_name}!")
+            self.snake1.kill(f"{self.player1_name} ran into {self.player2_name}!", self.now)
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
                 
         elif self.snake2.alive and self.snake2.check_collision_with_snake(self.snake1):
-            self.snake2.kill(f"{self.player2_name} ran into {self.player1_name}!")  
+            self.snake2.kill(f"{self.player2_name} ran into {self.player1_name}!", self.now)  
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
         
         # Check obstacle collisions
         if self.snake1.alive and self.snake1.check_collision_with_obstacles(self.obstacles):
-            self.snake1.kill(f"{self.player1_name} hit an obstacle!")
+            self.snake1.kill(f"{self.player1_name} hit an obstacle!", self.now)
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
                 
         if self.snake2.alive and self.snake2.check_collision_with_obstacles(self.obstacles):
-            self.snake2.kill(f"{self.player2_name} hit an obstacle!")
+            self.snake2.kill(f"{self.player2_name} hit an obstacle!", self.now)
             if self.first_death_time == 0:
-                self.first_death_time = pygame.time.get_ticks()
+                self.first_death_time = self.now
+        
+        # Check wall collisions (walled boards only)
+        if self.snake1.alive and self.snake1.hit_wall:
+            self.snake1.kill(f"{self.player1_name} hit the wall!", self.now)
+            if self.first_death_time == 0:
+                self.first_death_time = self.now
+                
+        if self.snake2.alive and self.snake2.hit_wall:
+            self.snake2.kill(f"{self.player2_name} hit the wall!", self.now)
+            if self.first_death_time == 0:
+                self.first_death_time = self.now
     
     def get_speed(self, snake: Snake) -> int:
         """Get current speed for a snake (accounts for speed boosts)"""
-        if snake.has_speed_boost():
+        if snake.has_speed_boost(self.now):
             return max(60, self.base_speed // 2)  # Double speed
         return self.base_speed
     
@@ -266,18 +369,138 @@ class Game:
                 else:
                     self.winner = "Tie"
                     # No wins added for tie
+                self.record_match_result()
             self.game_over = True
         elif not self.snake1.alive:
             if not self.game_over:  # Only update wins on first game over
                 self.winner = "Player 2 (Blue)"
                 self.player2_wins += 1
+                self.record_match_result()
             self.game_over = True
         elif not self.snake2.alive:
             if not self.game_over:  # Only update wins on first game over
                 self.winner = "Player 1 (Green)"
                 self.player1_wins += 1
+                self.record_match_result()
             self.game_over = True
     
+    def record_match_result(self):
+        """Hand the finished match to the persistent history store and ratings, if any"""
+        MATCHES_COMPLETED.inc()
+        winner = WINNERS[self.winner]
+        if winner == TIE:
+            winner = None  # History and ratings record a tie as no winner
+        if self.history:
+            self.history.record_match(self.player1_name, self.player2_name,
+                                      self.snake1.score, self.snake2.score, winner,
+                                      self.snake1.death_reason, self.snake2.death_reason)
+        if self.ratings:
+            self.ratings.record_result(self.player1_name, self.player2_name, winner)
+            # Saved per match so a crash loses nothing already played; the
+            # file is written in the background, off the frame loop
+            self.ratings.save()
+    
+    def state_hash(self) -> int:
+        """CRC32 of everything the rules depend on, for comparing lockstep peers"""
+        parts = []
+        for snake in (self.snake1, self.snake2):
+            body = snake.body
+            parts.append(SNAKE_HASH_FORMAT.pack(
+                body.digest, body.cell_at(0), len(body), DIRECTION_INDEX[snake.direction],
+                snake.score, snake.alive, snake.hit_wall, max(0, snake.speed_boost_end - self.now)))
+        cells = [to_cell(self.food.x, self.food.y)]
+        cells += [to_cell(pu.x, pu.y) * 4 + POWERUP_TYPES.index(pu.power_type) for pu in self.power_ups]
+        cells += [to_cell(obs.x, obs.y) for obs in self.obstacles]
+        parts.append(struct.pack(f"!{len(cells)}I", *cells))
+        return zlib.crc32(b"".join(parts))
+    
+    def update(self, current_time: int):
+        """Advance the match by one frame of game logic"""
+        self.now = current_time
+        
+        # Get current speeds
+        speed1 = self.get_speed(self.snake1)
+        speed2 = self.get_speed(self.snake2)
+        
+        # Check if snakes will eat food and move them accordingly
+        if current_time - self.last_move_time1 >= speed1:
+            self.input1.apply_next(self.snake1, current_time)
+            self.apply_bot_turn(1, current_time)
+            will_eat = self.check_will_eat_food(self.snake1)
+            self.snake1.move(grow=will_eat)
+            TICKS.inc()
+            
+            if will_eat:
+                self.snake1.score += 10
+                self.respawn_food_safely()
+            
+            self.last_move_time1 = current_time
+        
+        if current_time - self.last_move_time2 >= speed2:
+            self.input2.apply_next(self.snake2, current_time)
+            self.apply_bot_turn(2, current_time)
+            will_eat = self.check_will_eat_food(self.snake2)
+            self.snake2.move(grow=will_eat)
+            TICKS.inc()
+            
+            if will_eat:
+                self.snake2.score += 10
+                self.respawn_food_safely()
+            
+            self.last_move_time2 = current_time
+        
+        # Check power-up collisions
+        self.check_powerup_collisions()
+        
+        # Check deadly collisions
+        self.check_collisions()
+        
+        # Spawn power-ups
+        if current_time - self.last_powerup_spawn >= self.powerup_spawn_interval:
+            self.spawn_powerup()
+            self.last_powerup_spawn = current_time
+        
+        # Update game state
+        self.update_game_state()
+        if self.game_over:
+            self.game_state = GameState.GAME_OVER
+    
+    def draw_board(self):
+        """Draw obstacles, food, power-ups and snakes"""
+        self.screen.fill(BLACK)
+        
+        # Draw game objects
+        if self.obstacles:
+            for obstacle in self.obstacles:
+                obstacle.draw(self.screen)
+        
+        if self.food:
+            self.food.draw(self.screen)
+        
+        for powerup in self.power_ups:
+            powerup.draw(self.screen, self.now)
+        
+        if self.snake1:
+            self.snake1.draw(self.screen, self.now)
+        if self.snake2:
+            self.snake2.draw(self.screen, self.now)
+    
+    def draw_frame(self):
+        """Draw the current state onto self.screen (a window or an offscreen surface)"""
+        if self.game_state == GameState.NAME_INPUT:
+            self.draw_name_input_screen()
+        
+        elif self.game_state == GameState.PLAYING:
+            # Draw everything
+            self.draw_board()
+            self.draw_ui()
+        
+        elif self.game_state == GameState.GAME_OVER:
+            # Draw game (faded) with game over overlay
+            self.draw_board()
+            self.draw_ui()
+            self.draw_game_over()
+    
     def draw_name_input_screen(self):
         """Draw the name input screen"""
         self.screen.fill(BLACK)
@@ -321,7 +544,8 @@ class Game:
             
             # Draw cursor
             cursor_x = input_box_x + 10 + input_text.get_width()
-            if pygame.time.get_ticks() % 1000 < 500:  # Blinking cursor
+            self.cursor_rect = pygame.Rect(cursor_x - 1, input_box_y + 5, 3, 31)
+            if self.cursor_visible():  # Blinking cursor
                 pygame.draw.line(self.screen, WHITE, (cursor_x, input_box_y + 5), (cursor_x, input_box_y + 35), 2)
         
         # Instructions
@@ -361,13 +585,19 @@ class Game:
         self.screen.blit(controls2, (WINDOW_WIDTH - 200, WINDOW_HEIGHT - 50))
         
         # Speed boost indicators
-        if self.snake1.has_speed_boost():
+        if self.snake1.has_speed_boost(self.now):
             boost1 = self.small_font.render("SPEED BOOST!", True, CYAN)
-            self.screen.blit(boost1, (10, 50))
+            self.screen.blit(boost1, BOOST_LABEL_POSITIONS[0])
         
-        if self.snake2.has_speed_boost():
+        if self.snake2.has_speed_boost(self.now):
             boost2 = self.small_font.render("SPEED BOOST!", True, CYAN)
-            self.screen.blit(boost2, (WINDOW_WIDTH - 150, 50))
+            self.screen.blit(boost2, BOOST_LABEL_POSITIONS[1])
+        
+        # Lockstep peers that disagree about the state can no longer trust it
+        if self.lockstep and self.lockstep.desync:
+            tick, peer_id = self.lockstep.desync
+            desync_text = self.small_font.render(f"DESYNC with peer {peer_id} at tick {tick}", True, RED)
+            self.screen.blit(desync_text, (WINDOW_WIDTH // 2 - desync_text.get_width() // 2, 10))
         
         # Power-up legend
         legend_y = WINDOW_HEIGHT - 120
@@ -388,12 +618,19 @@ class Game:
     
     def draw_game_over(self):
         """Draw game over screen"""
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
+        # The overlay only changes with the result, so render it once per match
+        key = (self.winner, self.player1_name, self.player2_name, self.snake1.score,
+               self.snake2.score, self.player1_wins, self.player2_wins)
+        if self.game_over_layer is None or self.game_over_layer[0] != key:
+            self.game_over_layer = (key, self.render_game_over_layer())
+        self.screen.blit(self.game_over_layer[1], (0, 0))
+    
+    def render_game_over_layer(self) -> pygame.Surface:
+        """Half-transparent overlay with the results and instructions"""
+        layer = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        layer.fill((*BLACK, 128))
         
-        game_over_text = pygame.font.Font(None, 72).render("GAME OVER", True, WHITE)
+        game_over_text = self.title_font.render("GAME OVER", True, WHITE)
         
         # Show winner with actual name
         winner_display = self.winner
@@ -402,7 +639,7 @@ class Game:
         elif self.winner == "Player 2 (Blue)":
             winner_display = f"{self.player2_name} (Blue)"
         
-        winner_text = pygame.font.Font(None, 48).render(f"Winner: {winner_display}", True, WHITE)
+        winner_text = self.large_font.render(f"Winner: {winner_display}", True, WHITE)
         
         # Final scores
         final_score1 = self.font.render(f"{self.player1_name}: {self.snake1.score} points", True, DARK_GREEN)
@@ -419,42 +656,43 @@ class Game:
         quit_text = self.font.render("Press Q to quit", True, WHITE)
         
         # Center the text
-        self.screen.blit(game_over_text, 
-                        (WINDOW_WIDTH // 2 - game_over_text.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 - 140))
-        self.screen.blit(winner_text, 
-                        (WINDOW_WIDTH // 2 - winner_text.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 - 70))
+        layer.blit(game_over_text, 
+                   (WINDOW_WIDTH // 2 - game_over_text.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 - 140))
+        layer.blit(winner_text, 
+                   (WINDOW_WIDTH // 2 - winner_text.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 - 70))
         
         # Final scores this game
-        self.screen.blit(final_score1, 
-                        (WINDOW_WIDTH // 2 - final_score1.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 - 30))
-        self.screen.blit(final_score2, 
-                        (WINDOW_WIDTH // 2 - final_score2.get_width() // 2, 
-                         WINDOW_HEIGHT // 2))
+        layer.blit(final_score1, 
+                   (WINDOW_WIDTH // 2 - final_score1.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 - 30))
+        layer.blit(final_score2, 
+                   (WINDOW_WIDTH // 2 - final_score2.get_width() // 2, 
+                    WINDOW_HEIGHT // 2))
         
         # Overall win counts
-        self.screen.blit(overall_wins1, 
-                        (WINDOW_WIDTH // 2 - overall_wins1.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 + 40))
-        self.screen.blit(overall_wins2, 
-                        (WINDOW_WIDTH // 2 - overall_wins2.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 + 70))
+        layer.blit(overall_wins1, 
+                   (WINDOW_WIDTH // 2 - overall_wins1.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 + 40))
+        layer.blit(overall_wins2, 
+                   (WINDOW_WIDTH // 2 - overall_wins2.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 + 70))
         
         # Instructions
-        self.screen.blit(restart_text, 
-                        (WINDOW_WIDTH // 2 - restart_text.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 + 110))
-        self.screen.blit(name_text, 
-                        (WINDOW_WIDTH // 2 - name_text.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 + 140))
-        self.screen.blit(reset_text, 
-                        (WINDOW_WIDTH // 2 - reset_text.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 + 170))
-        self.screen.blit(quit_text, 
-                        (WINDOW_WIDTH // 2 - quit_text.get_width() // 2, 
-                         WINDOW_HEIGHT // 2 + 200))
+        layer.blit(restart_text, 
+                   (WINDOW_WIDTH // 2 - restart_text.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 + 110))
+        layer.blit(name_text, 
+                   (WINDOW_WIDTH // 2 - name_text.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 + 140))
+        layer.blit(reset_text, 
+                   (WINDOW_WIDTH // 2 - reset_text.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 + 170))
+        layer.blit(quit_text, 
+                   (WINDOW_WIDTH // 2 - quit_text.get_width() // 2, 
+                    WINDOW_HEIGHT // 2 + 200))
+        return layer
     
     def handle_name_input(self, event):
         """Handle text input for player names"""
@@ -496,16 +734,16 @@ class Game:
                 if len(self.name_input) < 15 and event.unicode.isprintable():
                     self.name_input += event.unicode
     
-    def start_game(self):
+    def start_game(self, seed: Optional[int] = None):
         """Start a new game"""
         self.game_state = GameState.PLAYING
         self.first_time = False
         self.input_active = False
-        self.initialize_game_objects()
+        self.initialize_game_objects(seed)
     
-    def restart_game(self):
+    def restart_game(self, seed: Optional[int] = None):
         """Restart the current game with same names"""
-        self.initialize_game_objects()
+        self.initialize_game_objects(seed)
         self.game_state = GameState.PLAYING
     
     def go_to_name_input(self):
@@ -520,140 +758,172 @@ class Game:
         self.player1_wins = 0
         self.player2_wins = 0
     
+    def handle_event(self, event: pygame.event.Event) -> bool:
+        """Route an event by game state; returns False once the player quits"""
+        if event.type == pygame.QUIT:
+            return False
+        
+        elif self.lockstep:
+            # Peers restart matches together, so only turns and quitting apply
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_q:
+                    return False
+                elif event.key in KEY_BINDINGS:
+                    self.lockstep.queue_input(KEY_BINDINGS[event.key][1])
+        
+        elif self.game_state == GameState.NAME_INPUT:
+            self.handle_name_input(event)
+        
+        elif self.game_state == GameState.PLAYING:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_q:
+                    return False
+                else:
+                    self.handle_input(event)
+        
+        elif self.game_state == GameState.GAME_OVER:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_q:
+                    return False
+                elif event.key == pygame.K_r:
+                    self.restart_game()
+                elif event.key == pygame.K_n:
+                    self.go_to_name_input()
+                elif event.key == pygame.K_c:
+                    self.reset_win_count()
+        return True
+    
+    def cursor_visible(self) -> bool:
+        return self.now % 1000 < 500
+    
+    def blink_regions(self) -> List[Tuple[object, pygame.Rect]]:
+        """Current look and screen area of everything that blinks on a menu screen"""
+        if self.game_state == GameState.NAME_INPUT:
+            if self.input_active and self.cursor_rect:
+                return [(self.cursor_visible(), self.cursor_rect)]
+            return []
+        
+        regions = [(powerup.appearance(self.now), powerup.bounds()) for powerup in self.power_ups]
+        label_size = self.small_font.size("SPEED BOOST!")
+        for snake, label_position in zip((self.snake1, self.snake2), BOOST_LABEL_POSITIONS):
+            if snake:
+                regions.append((snake.appearance(self.now), snake.bounds()))
+                regions.append((snake.has_speed_boost(self.now), pygame.Rect(label_position, label_size)))
+        return regions
+    
+    def next_blink_time(self) -> Optional[int]:
+        """When the next entry of blink_regions() changes its look, if ever"""
+        if self.game_state == GameState.NAME_INPUT:
+            return (self.now // 500 + 1) * 500 if self.input_active else None
+        
+        times = [powerup.next_appearance_change(self.now) for powerup in self.power_ups]
+        times += [snake.next_appearance_change(self.now) for snake in (self.snake1, self.snake2) if snake]
+        times = [t for t in times if t is not None]
+        return min(times) if times else None
+    
+    def run_idle(self) -> bool:
+        """Wait for input or the next blink, then redraw only what changed.
+        
+        Menus and the game over screen stay the same apart from a few blinking
+        things, so instead of drawing them 60 times a second this sleeps in
+        pygame.event.wait until a key press or a timer set for the next blink.
+        Returns False once the player quits.
+        """
+        if self.idle_redraw:
+            self.now = pygame.time.get_ticks()
+            self.draw_frame()
+            pygame.display.flip()
+            self.publish_spectators()
+            self.save_snapshot()
+            self.blink_keys = [key for key, _ in self.blink_regions()]
+            self.idle_redraw = False
+        
+        next_blink = self.next_blink_time()
+        pygame.time.set_timer(BLINK_EVENT, 0 if next_blink is None else max(1, next_blink - self.now), 1)
+        events = [pygame.event.wait()] + pygame.event.get()
+        IDLE_WAKEUPS.inc()
+        self.now = pygame.time.get_ticks()
+        
+        running = True
+        for event in events:
+            if event.type == pygame.KEYDOWN or event.type in REDRAW_EVENTS:
+                self.idle_redraw = True
+            if event.type != BLINK_EVENT and not self.handle_event(event):
+                running = False
+        
+        if self.game_state == GameState.PLAYING:
+            pygame.time.set_timer(BLINK_EVENT, 0)
+        elif not self.idle_redraw:
+            # Only a blink is due: redraw the areas whose look changed
+            regions = self.blink_regions()
+            dirty = [rect for (key, rect), drawn in zip(regions, self.blink_keys) if key != drawn]
+            if dirty:
+                # One clipped draw covering every changed area, not a full draw per area
+                area = dirty[0].unionall(dirty[1:])
+                self.screen.set_clip(area)
+                self.draw_frame()
+                self.screen.set_clip(None)
+                pygame.display.update(area)
+            self.blink_keys = [key for key, _ in regions]
+        return running
+    
+    def save_snapshot(self):
+        """Hand the current state to the autosave writer, if any"""
+        if not self.snapshots:
+            return
+        start = time.perf_counter()
+        data = encode_snapshot(self)
+        SNAPSHOT_TIME.observe((time.perf_counter() - start) * 1000)
+        self.snapshots.submit(data)
+        self.last_snapshot = self.now
+    
+    def publish_spectators(self):
+        """Broadcast the latest state to spectators"""
+        if self.spectators:
+            self.spectators.publish(self)
+            SPECTATORS.set(len(self.spectators.subscribers))
+    
     def run(self):
         """Main game loop"""
         running = True
-        last_move_time1 = pygame.time.get_ticks()
-        last_move_time2 = pygame.time.get_ticks()
         
         while running:
+            # Lockstep peers keep ticking through the game over screen
+            if self.game_state != GameState.PLAYING and not self.lockstep:
+                running = self.run_idle()
+                continue
+            self.idle_redraw = True
+            
             current_time = pygame.time.get_ticks()
+            frame_start = time.perf_counter()
+            if not self.lockstep:
+                self.now = current_time
             
             # Handle events based on current state
             for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+                if not self.handle_event(event):
                     running = False
-                
-                elif self.game_state == GameState.NAME_INPUT:
-                    self.handle_name_input(event)
-                
-                elif self.game_state == GameState.PLAYING:
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_q:
-                            running = False
-                
-                elif self.game_state == GameState.GAME_OVER:
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_q:
-                            running = False
-                        elif event.key == pygame.K_r:
-                            self.restart_game()
-                        elif event.key == pygame.K_n:
-                            self.go_to_name_input()
-                        elif event.key == pygame.K_c:
-                            self.reset_win_count()
             
             # Game logic based on current state
-            if self.game_state == GameState.PLAYING and not self.game_over:
-                # Handle continuous input
-                self.handle_input()
-                
-                # Get current speeds
-                speed1 = self.get_speed(self.snake1)
-                speed2 = self.get_speed(self.snake2)
-                
-                # Check if snakes will eat food and move them accordingly
-                if current_time - last_move_time1 >= speed1:
-                    will_eat = self.check_will_eat_food(self.snake1)
-                    self.snake1.move(grow=will_eat)
-                    
-                    if will_eat:
-                        self.snake1.score += 10
-                        self.respawn_food_safely()
-                    
-                    last_move_time1 = current_time
-                
-                if current_time - last_move_time2 >= speed2:
-                    will_eat = self.check_will_eat_food(self.snake2)
-                    self.snake2.move(grow=will_eat)
-                    
-                    if will_eat:
-                        self.snake2.score += 10
-                        self.respawn_food_safely()
-                    
-                    last_move_time2 = current_time
-                
-                # Check power-up collisions
-                self.check_powerup_collisions()
-                
-                # Check deadly collisions
-                self.check_collisions()
-                
-                # Spawn power-ups
-                if current_time - self.last_powerup_spawn >= self.powerup_spawn_interval:
-                    self.spawn_powerup()
-                    self.last_powerup_spawn = current_time
-                
-                # Update game state
-                self.update_game_state()
-                if self.game_over:
-                    self.game_state = GameState.GAME_OVER
+            if self.lockstep:
+                self.lockstep.poll(current_time)
+            elif self.game_state == GameState.PLAYING and not self.game_over:
+                self.update(current_time)
             
-            # Draw based on current state
-            if self.game_state == GameState.NAME_INPUT:
-                self.draw_name_input_screen()
+            # Broadcast the latest state to spectators
+            self.publish_spectators()
             
-            elif self.game_state == GameState.PLAYING:
-                # Draw everything
-                self.screen.fill(BLACK)
-                
-                # Draw game objects
-                if self.obstacles:
-                    for obstacle in self.obstacles:
-                        obstacle.draw(self.screen)
-                
-                if self.food:
-                    self.food.draw(self.screen)
-                
-                for powerup in self.power_ups:
-                    powerup.draw(self.screen)
-                
-                if self.snake1:
-                    self.snake1.draw(self.screen)
-                if self.snake2:
-                    self.snake2.draw(self.screen)
-                
-                # Draw UI
-                self.draw_ui()
+            if self.now - self.last_snapshot >= self.snapshot_interval:
+                self.save_snapshot()
             
-            elif self.game_state == GameState.GAME_OVER:
-                # Draw game (faded) with game over overlay
-                self.screen.fill(BLACK)
-                
-                # Draw faded game objects
-                if self.obstacles:
-                    for obstacle in self.obstacles:
-                        obstacle.draw(self.screen)
-                
-                if self.food:
-                    self.food.draw(self.screen)
-                
-                for powerup in self.power_ups:
-                    powerup.draw(self.screen)
-                
-                if self.snake1:
-                    self.snake1.draw(self.screen)
-                if self.snake2:
-                    self.snake2.draw(self.screen)
-                
-                # Draw UI
-                self.draw_ui()
-                
-                # Draw game over screen
-                self.draw_game_over()
+            # Draw based on current state
+            self.draw_frame()
             
             pygame.display.flip()
+            FRAME_TIME.observe((time.perf_counter() - frame_start) * 1000)
             self.clock.tick(60)  # 60 FPS
+            FPS.set(self.clock.get_fps())
         
+        self.save_snapshot()
         pygame.quit()
         sys.exit() 
\ No newline at end of file
@@ -0,0 +1,75 @@
+# Board cells encoded as single ints: cell = y * GRID_WIDTH + x
+from functools import lru_cache
+from typing import Tuple
+from .constants import GRID_WIDTH, GRID_HEIGHT
+from .enums import Direction
+
+NUM_CELLS = GRID_WIDTH * GRID_HEIGHT
+
+# Column order of Board.next_cell
+DIRECTIONS = (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT)
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+# next_cell value for a step off the edge of a walled board
+WALL = -1
+
+
+def to_cell(x: int, y: int) -> int:
+    return y * GRID_WIDTH + x
+
+
+def from_cell(cell: int) -> Tuple[int, int]:
+    y, x = divmod(cell, GRID_WIDTH)
+    return (x, y)
+
+
+# (x, y) of every cell, built once so decoding a body allocates no tuples
+POSITIONS = tuple(from_cell(cell) for cell in range(NUM_CELLS))
+
+
+class Board:
+    """Precomputed neighbour table: next_cell[cell][DIRECTION_INDEX[direction]].
+
+    Built once per edge rule, so a step is one indexed load instead of edge
+    checks. On a wrapping board the edges lead to the opposite side; on a
+    walled board they lead to WALL. The size is always GRID_WIDTH x
+    GRID_HEIGHT, since that is what to_cell, from_cell and SnakeBody encode.
+    """
+
+    __slots__ = ("width", "height", "wrap", "next_cell")
+
+    def __init__(self, wrap: bool = True):
+        self.width = width = GRID_WIDTH
+        self.height = height = GRID_HEIGHT
+        self.wrap = wrap
+
+        next_cell = []
+        for cell in range(width * height):
+            y, x = divmod(cell, width)
+            neighbors = []
+            for direction in DIRECTIONS:
+                dx, dy = direction.value
+                new_x, new_y = x + dx, y + dy
+                if 0 <= new_x < width and 0 <= new_y < height:
+                    neighbors.append(new_y * width + new_x)
+                elif wrap:
+                    neighbors.append((new_y % height) * width + new_x % width)
+                else:
+                    neighbors.append(WALL)
+            next_cell.append(tuple(neighbors))
+        self.next_cell = tuple(next_cell)
+
+    def distance(self, a: int, b: int) -> int:
+        """Fewest moves between two cells, ignoring anything in the way"""
+        ay, ax = divmod(a, self.width)
+        by, bx = divmod(b, self.width)
+        dx, dy = abs(ax - bx), abs(ay - by)
+        if self.wrap:
+            dx, dy = min(dx, self.width - dx), min(dy, self.height - dy)
+        return dx + dy
+
+
+@lru_cache(maxsize=None)
+def get_board(wrap: bool = True) -> Board:
+    """Shared Board for an edge rule; tables are immutable, so one of each is enough"""
+    return Board(wrap)
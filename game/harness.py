@@ -0,0 +1,46 @@
+"""Helpers shared by the command-line benchmarks, load tests and exports"""
+
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# One offscreen Game per process, reused for every job it runs
+_worker_game = None
+
+
+def worker_game():
+    """This process's offscreen Game, created on first use"""
+    global _worker_game
+    if _worker_game is None:
+        from .render import create_offscreen_game
+
+        _worker_game = create_offscreen_game()
+    return _worker_game
+
+
+def map_on_workers(function: Callable, jobs: Iterable, workers: Optional[int] = None) -> Iterator:
+    """Run jobs on a process pool, one per core by default, yielding results as they finish.
+
+    Each worker builds its offscreen Game up front, so jobs can call
+    worker_game() without paying for pygame start-up.
+    """
+    import multiprocessing
+
+    pool = multiprocessing.Pool(workers or os.cpu_count(), initializer=worker_game)
+    try:
+        yield from pool.imap_unordered(function, jobs)
+    finally:
+        # Let workers exit on their own; terminating them during pygame teardown can hang
+        pool.close()
+        pool.join()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def print_report(report: Dict, width: int = 18, precision: int = 3):
+    """One right-aligned `name: value` line per entry, floats to the given precision"""
+    for name, value in report.items():
+        print(f"{name:>{width}}: {value:.{precision}f}" if isinstance(value, float) else f"{name:>{width}}: {value}")
@@ -0,0 +1,381 @@
+"""Peer-to-peer lockstep over UDP.
+
+Every peer runs its own Game; only per-tick direction inputs cross the
+network. A tick is simulated once every player's input for it is known, and
+each input is scheduled ``input_delay`` ticks ahead so it usually arrives in
+time. Packets repeat every input the receiver has not acknowledged (and at
+least the last ``redundancy``), so a lost datagram costs nothing as long as a
+later one gets through. Peers swap Game.state_hash() every ``hash_interval``
+ticks and flag the first tick where any two disagree.
+
+Peer 0 steers snake 1, peer 1 steers snake 2, any further peers only watch.
+"""
+
+import heapq
+import random
+import socket
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .enums import Direction, GameState
+from .grid import DIRECTIONS, DIRECTION_INDEX
+
+# Game time advanced per lockstep tick
+TICK_MS = 20
+
+# Resend the unacknowledged inputs this often while waiting on a peer
+RESEND_MS = TICK_MS
+
+# Most ticks simulated in one poll when catching up after a stall
+MAX_CATCH_UP = 5
+
+# Ticks spent on the game over screen before every peer restarts the match
+RESTART_TICKS = 3000 // TICK_MS
+
+# Own state hashes kept for comparing against late peer hashes
+HASH_HISTORY = 512
+
+# Packet: sender id, ack, hash tick, hash, first input tick, input count, then one
+# byte per input (0 = no turn, 1-4 = DIRECTIONS index + 1)
+PACKET_HEADER = struct.Struct("!BiiIiB")
+MAX_INPUTS = 255
+
+Address = Tuple[str, int]
+
+
+class UdpLink:
+    """Sends datagrams straight out of the socket"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    def sendto(self, data: bytes, address: Address):
+        self.sock.sendto(data, address)
+
+    def flush(self):
+        pass
+
+
+class LossyLink(UdpLink):
+    """Drops and delays outgoing datagrams to test lockstep over loopback"""
+
+    def __init__(self, sock: socket.socket, loss: float = 0.0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, seed: Optional[int] = None,
+                 clock: Optional[Callable[[], float]] = None):
+        super().__init__(sock)
+        self.loss = loss
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(seed)
+        self.clock = clock or (lambda: time.monotonic() * 1000)
+        self.queue: List[Tuple[float, int, bytes, Address]] = []
+        self.sent = 0
+        self.dropped = 0
+
+    def sendto(self, data: bytes, address: Address):
+        self.sent += 1
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        # Jitter also reorders datagrams, as a real network may
+        due = self.clock() + self.latency_ms + self.rng.uniform(0, self.jitter_ms)
+        heapq.heappush(self.queue, (due, self.sent, data, address))
+
+    def flush(self):
+        now = self.clock()
+        while self.queue and self.queue[0][0] <= now:
+            _, _, data, address = heapq.heappop(self.queue)
+            self.sock.sendto(data, address)
+
+
+def encode_direction(direction: Optional[Direction]) -> int:
+    return 0 if direction is None else DIRECTION_INDEX[direction] + 1
+
+
+class LockstepPeer:
+    """Drives a Game in lockstep with the other peers of a session"""
+
+    def __init__(self, game, peer_id: int, sock: socket.socket, peers: Dict[int, Address],
+                 seed: int = 0, input_delay: int = 3, redundancy: int = 8,
+                 hash_interval: int = 10, link: Optional[UdpLink] = None):
+        self.game = game
+        self.peer_id = peer_id
+        self.player = peer_id + 1 if peer_id < 2 else None
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.peers = {pid: address for pid, address in peers.items() if pid != peer_id}
+        self.link = link or UdpLink(sock)
+        self.seed = seed
+        self.input_delay = input_delay
+        self.redundancy = redundancy
+        self.hash_interval = hash_interval
+
+        # Inputs per player by tick; the first input_delay ticks have no turns
+        self.inputs: Dict[int, Dict[int, int]] = {1: {}, 2: {}}
+        for player_inputs in self.inputs.values():
+            for tick in range(input_delay):
+                player_inputs[tick] = 0
+        # Highest tick up to which each player's inputs are all known
+        self.known = {1: input_delay - 1, 2: input_delay - 1}
+        # Highest tick of our inputs each peer has confirmed holding
+        self.acks = {pid: -1 for pid in self.peers}
+        self.pending: Optional[Direction] = None
+
+        self.tick = 0
+        self.match = 0
+        self.game_over_tick: Optional[int] = None
+        self.hashes: Dict[int, int] = {}
+        self.remote_hashes: Dict[int, Tuple[int, int]] = {}
+        self.last_hash = (-1, 0)
+        self.desync: Optional[Tuple[int, int]] = None  # (tick, peer id)
+
+        self.next_tick_at: Optional[float] = None
+        self.last_send = float("-inf")
+        self.stalls = 0
+        self.stalled_tick = -1
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.bytes_sent = 0
+
+        # Every peer starts from the same seed and the same game clock
+        game.lockstep = self
+        game.now = 0
+        game.start_game(seed)
+
+    def queue_input(self, direction: Direction):
+        """Turn the local snake at the next free input slot (observers ignore this)"""
+        if self.player is not None:
+            self.pending = direction
+
+    def ready(self) -> bool:
+        return self.known[1] >= self.tick and self.known[2] >= self.tick
+
+    def poll(self, now_ms: float) -> int:
+        """Exchange packets and simulate every tick that is due and ready"""
+        self.receive()
+        if self.next_tick_at is None:
+            self.next_tick_at = now_ms
+
+        advanced = 0
+        while now_ms >= self.next_tick_at and advanced < MAX_CATCH_UP:
+            if not self.ready():
+                if self.stalled_tick != self.tick:
+                    self.stalls += 1
+                    self.stalled_tick = self.tick
+                break
+            self.advance()
+            advanced += 1
+            self.next_tick_at += TICK_MS
+        # Don't build up a backlog of due ticks while stalled
+        if now_ms - self.next_tick_at > TICK_MS * MAX_CATCH_UP:
+            self.next_tick_at = now_ms
+
+        if advanced or now_ms - self.last_send >= RESEND_MS:
+            self.send()
+            self.last_send = now_ms
+        self.link.flush()
+        return advanced
+
+    def advance(self):
+        """Simulate self.tick with the agreed inputs"""
+        game = self.game
+        tick = self.tick
+        now = (tick + 1) * TICK_MS
+
+        # Our input for a later tick, sent ahead of time
+        if self.player is not None:
+            self.inputs[self.player][tick + self.input_delay] = encode_direction(self.pending)
+            self.known[self.player] = tick + self.input_delay
+            self.pending = None
+
+        for player, queue, snake in ((1, game.input1, game.snake1), (2, game.input2, game.snake2)):
+            code = self.inputs[player].pop(tick) if player != self.player else self.inputs[player][tick]
+            if code:
+                queue.push(DIRECTIONS[code - 1], snake.direction, now)
+
+        if game.game_state == GameState.PLAYING and not game.game_over:
+            game.update(now)
+        else:
+            game.now = now
+            if self.game_over_tick is None:
+                self.game_over_tick = tick
+            elif tick - self.game_over_tick >= RESTART_TICKS:
+                # Restart together, each match from its own seed
+                self.match += 1
+                self.game_over_tick = None
+                game.restart_game(self.seed + self.match)
+
+        if tick % self.hash_interval == 0:
+            state_hash = game.state_hash()
+            self.hashes[tick] = state_hash
+            self.hashes.pop(tick - HASH_HISTORY * self.hash_interval, None)
+            self.last_hash = (tick, state_hash)
+            if tick in self.remote_hashes:
+                self.check_hash(tick, *self.remote_hashes.pop(tick))
+
+        self.tick += 1
+        if tick % 64 == 0:
+            self.prune()
+
+    def prune(self):
+        """Forget our own inputs that every peer holds and that fell out of the redundancy window"""
+        if self.player is None:
+            return
+        floor = min([self.known[self.player] - self.redundancy, self.tick] +
+                    [ack + 1 for ack in self.acks.values()])
+        own = self.inputs[self.player]
+        for tick in [tick for tick in own if tick < floor]:
+            del own[tick]
+
+    def check_hash(self, tick: int, peer_id: int, remote_hash: int):
+        if self.hashes.get(tick, remote_hash) != remote_hash and self.desync is None:
+            self.desync = (tick, peer_id)
+
+    def send(self):
+        header_hash_tick, header_hash = self.last_hash
+        for pid, address in self.peers.items():
+            # Acknowledge the inputs of the player this peer steers
+            ack = self.known[pid + 1] if pid < 2 else -1
+            first, codes = 0, b""
+            if self.player is not None:
+                latest = self.known[self.player]
+                first = max(0, min(self.acks[pid] + 1, latest - self.redundancy + 1))
+                own = self.inputs[self.player]
+                codes = bytes(own[tick] for tick in range(first, min(latest + 1, first + MAX_INPUTS)))
+            packet = PACKET_HEADER.pack(self.peer_id, ack, header_hash_tick, header_hash,
+                                        first, len(codes)) + codes
+            self.link.sendto(packet, address)
+            self.packets_sent += 1
+            self.bytes_sent += len(packet)
+
+    def receive(self):
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(PACKET_HEADER.size + MAX_INPUTS)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                continue  # ICMP unreachable from a peer that hasn't bound yet
+            if len(data) < PACKET_HEADER.size:
+                continue
+            sender, ack, hash_tick, remote_hash, first, count = PACKET_HEADER.unpack_from(data)
+            if sender not in self.peers or len(data) != PACKET_HEADER.size + count:
+                continue
+            self.packets_received += 1
+
+            if ack > self.acks[sender]:
+                self.acks[sender] = ack
+
+            if count and sender < 2:
+                player = sender + 1
+                player_inputs = self.inputs[player]
+                for offset, code in enumerate(data[PACKET_HEADER.size:]):
+                    tick = first + offset
+                    if tick >= self.tick and code <= len(DIRECTIONS):
+                        player_inputs.setdefault(tick, code)
+                known = self.known[player]
+                while known + 1 in player_inputs:
+                    known += 1
+                self.known[player] = known
+
+            if hash_tick >= 0:
+                if hash_tick < self.tick:
+                    self.check_hash(hash_tick, sender, remote_hash)
+                else:
+                    self.remote_hashes.setdefault(hash_tick, (sender, remote_hash))
+
+    def close(self):
+        self.game.lockstep = None
+        self.sock.close()
+
+
+def bind_peer_socket(address: Address) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(address)
+    return sock
+
+
+def run_loopback_test(peers: int = 2, ticks: int = 3000, loss: float = 0.2,
+                      latency_ms: float = 40.0, jitter_ms: float = 20.0, input_delay: int = 3,
+                      redundancy: int = 8, hash_interval: int = 10, seed: int = 1,
+                      turn_chance: float = 0.2, desync_at: Optional[int] = None) -> Dict:
+    """Run several peers in one process over loopback UDP with injected loss and latency.
+
+    Time is simulated in 1 ms steps so the run is repeatable and much faster than
+    real time. With ``desync_at`` set, peer 1 corrupts its score at that tick and the
+    report shows when the hashes caught it.
+    """
+    from .render import create_offscreen_game
+
+    clock = [0.0]
+    sockets = [bind_peer_socket(("127.0.0.1", 0)) for _ in range(peers)]
+    addresses = {pid: sock.getsockname() for pid, sock in enumerate(sockets)}
+    lockstep_peers = []
+    for pid, sock in enumerate(sockets):
+        link = LossyLink(sock, loss, latency_ms, jitter_ms, seed=seed * 100 + pid,
+                         clock=lambda: clock[0])
+        lockstep_peers.append(LockstepPeer(create_offscreen_game(), pid, sock, addresses, seed,
+                                           input_delay, redundancy, hash_interval, link))
+
+    rng = random.Random(seed)
+    directions = list(Direction)
+    start = time.perf_counter()
+    while min(peer.tick for peer in lockstep_peers) < ticks:
+        clock[0] += 1
+        for peer in lockstep_peers:
+            if peer.player is not None and rng.random() < turn_chance / TICK_MS:
+                peer.queue_input(rng.choice(directions))
+            if desync_at is not None and peer.peer_id == 1 and peer.tick == desync_at:
+                peer.game.snake1.score += 1
+                desync_at = None
+            peer.poll(clock[0])
+    elapsed = time.perf_counter() - start
+
+    # Every hash both peers still hold must match, unless we broke it on purpose
+    shared = set.intersection(*(set(peer.hashes) for peer in lockstep_peers))
+    agree = all(len({peer.hashes[tick] for peer in lockstep_peers}) == 1 for tick in shared)
+    desyncs = [peer.desync for peer in lockstep_peers if peer.desync]
+    report = {
+        "peers": peers,
+        "ticks": min(peer.tick for peer in lockstep_peers),
+        "simulated_ms": clock[0],
+        "wall_s": elapsed,
+        "slowdown": clock[0] / (ticks * TICK_MS),
+        "stalls": sum(peer.stalls for peer in lockstep_peers),
+        "matches": max(peer.match for peer in lockstep_peers) + 1,
+        "packets_sent": sum(peer.packets_sent for peer in lockstep_peers),
+        "packets_dropped": sum(peer.link.dropped for peer in lockstep_peers),
+        "bytes_per_tick": sum(peer.bytes_sent for peer in lockstep_peers) / ticks,
+        "hashes_compared": len(shared),
+        "hashes_agree": agree,
+        "desync_tick": min(tick for tick, _ in desyncs) if desyncs else None,
+    }
+    for peer in lockstep_peers:
+        peer.close()
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .harness import print_report
+
+    parser = argparse.ArgumentParser(description="Lockstep loopback test with injected loss and latency")
+    parser.add_argument("--peers", type=int, default=2)
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--loss", type=float, default=0.2)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--input-delay", type=int, default=3)
+    parser.add_argument("--redundancy", type=int, default=8)
+    parser.add_argument("--hash-interval", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--desync-at", type=int, default=None,
+                        help="Corrupt peer 1's state at this tick to check detection")
+    args = parser.parse_args()
+
+    report = run_loopback_test(args.peers, args.ticks, args.loss, args.latency_ms, args.jitter_ms,
+                               args.input_delay, args.redundancy, args.hash_interval, args.seed,
+                               desync_at=args.desync_at)
+    print_report(report, width=16)
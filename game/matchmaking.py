@@ -0,0 +1,310 @@
+"""Matchmaking: incremental Elo ratings and a rating-bucketed waiting queue.
+
+EloRatings keeps one rating per player name and moves it as each result
+comes in; Game.record_match_result feeds it the outcome update_game_state
+decided. Matchmaker pairs waiting players of similar rating. Players sit in
+fixed-width rating buckets, oldest first, and a search walks outwards from
+the player's own bucket to the edges of their window, so its cost depends
+on the window rather than on how many players are queued. Windows widen in
+steps the longer a player waits; a heap of step times retries exactly the
+players whose window just grew.
+"""
+
+import heapq
+import itertools
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .fileio import LatestWriter
+from .harness import percentile, print_report
+from .metrics import REGISTRY
+
+DEFAULT_RATING = 1500.0
+PROVISIONAL_GAMES = 30
+
+QUEUE_TIME = REGISTRY.histogram("matchmaking_queue_ms", "Time from joining the queue to being paired",
+                                buckets=(250, 500, 1000, 2000, 5000, 10000, 20000, 30000, 60000, 120000))
+QUEUED = REGISTRY.gauge("matchmaking_queued", "Players waiting for a match")
+PAIRINGS = REGISTRY.counter("matchmaking_pairings", "Matches made by the matchmaker")
+
+
+class EloRatings:
+    """Per-player Elo ratings, updated incrementally from each match result"""
+
+    def __init__(self, path: Optional[str] = None, k_factor: float = 20.0, provisional_k: float = 40.0):
+        self.path = path
+        self.k_factor = k_factor
+        self.provisional_k = provisional_k
+        self.ratings: Dict[str, float] = {}
+        self.games: Dict[str, int] = {}
+        self.writer: Optional[LatestWriter] = None
+
+    def rating(self, name: str) -> float:
+        return self.ratings.get(name, DEFAULT_RATING)
+
+    @staticmethod
+    def expected_score(rating: float, opponent: float) -> float:
+        """Chance of winning (counting a tie as half) against the opponent"""
+        return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+    def record_result(self, player1: str, player2: str, winner: Optional[int]) -> Tuple[float, float]:
+        """Apply one result (winner 1, 2 or None for a tie); returns the new ratings"""
+        rating1, rating2 = self.rating(player1), self.rating(player2)
+        if player1 == player2:
+            return rating1, rating2
+
+        score1 = 1.0 if winner == 1 else 0.0 if winner == 2 else 0.5
+        change = score1 - self.expected_score(rating1, rating2)
+        rating1 += self._k(player1) * change
+        rating2 -= self._k(player2) * change
+        for name, rating in ((player1, rating1), (player2, rating2)):
+            self.ratings[name] = rating
+            self.games[name] = self.games.get(name, 0) + 1
+        return rating1, rating2
+
+    def _k(self, name: str) -> float:
+        # New players move faster until their rating has had time to settle
+        return self.provisional_k if self.games.get(name, 0) < PROVISIONAL_GAMES else self.k_factor
+
+    def load(self):
+        """Read saved ratings; a missing file just means nobody has played yet"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            saved = json.load(f)
+        for name, (rating, games) in saved.items():
+            self.ratings[name] = float(rating)
+            self.games[name] = int(games)
+
+    def save(self):
+        """Hand the ratings to a background writer; a newer save replaces one not yet written"""
+        if not self.path:
+            return
+        if self.writer is None:
+            self.writer = LatestWriter(self.path, name="ratings-writer", label="Ratings")
+        saved = {name: [rating, self.games.get(name, 0)] for name, rating in self.ratings.items()}
+        self.writer.submit(json.dumps(saved).encode())
+
+    def close(self):
+        """Finish any save still pending"""
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+
+class Ticket:
+    """A player waiting in the matchmaking queue"""
+
+    __slots__ = ("name", "rating", "joined", "bucket")
+
+    def __init__(self, name: str, rating: float, joined: int, bucket: int):
+        self.name = name
+        self.rating = rating
+        self.joined = joined
+        self.bucket = bucket
+
+
+class Matchmaker:
+    """Pairs waiting players whose ratings lie within the searcher's window.
+
+    Times are in milliseconds, like the game clock. The window starts at
+    initial_window rating points and grows by widen_by every widen_every ms
+    up to max_window. Whoever searches decides: a player who has waited long
+    accepts a newcomer the newcomer's own narrower window would have skipped.
+    """
+
+    def __init__(self, ratings: Optional[EloRatings] = None, bucket_width: int = 25,
+                 initial_window: int = 50, widen_by: int = 25, widen_every: int = 2000,
+                 max_window: int = 400):
+        self.ratings = ratings or EloRatings()
+        self.bucket_width = bucket_width
+        self.initial_window = initial_window
+        self.widen_by = widen_by
+        self.widen_every = widen_every
+        self.max_window = max_window
+
+        self.waiting: Dict[str, Ticket] = {}
+        # OrderedDict rather than dict: taking the oldest player over and over
+        # leaves holes at the front of a plain dict that every scan must skip
+        self.buckets: Dict[int, OrderedDict] = {}
+        self.fresh: List[Ticket] = []
+        self.retries: List[Tuple[int, int, Ticket]] = []
+        self.sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    def enqueue(self, name: str, now: int) -> bool:
+        """Join the queue at the player's current rating; False if already waiting"""
+        if name in self.waiting:
+            return False
+        rating = self.ratings.rating(name)
+        ticket = Ticket(name, rating, now, int(rating // self.bucket_width))
+        self.waiting[name] = ticket
+        self.buckets.setdefault(ticket.bucket, OrderedDict())[name] = ticket
+        self.fresh.append(ticket)
+        return True
+
+    def cancel(self, name: str) -> bool:
+        """Leave the queue; False if the player was not waiting"""
+        ticket = self.waiting.get(name)
+        if ticket is None:
+            return False
+        self._remove(ticket)
+        return True
+
+    def window(self, ticket: Ticket, now: int) -> int:
+        steps = (now - ticket.joined) // self.widen_every
+        return min(self.max_window, self.initial_window + steps * self.widen_by)
+
+    def poll(self, now: int) -> List[Tuple[Ticket, Ticket]]:
+        """Search for everyone who joined or whose window grew since the last poll"""
+        pairs: List[Tuple[Ticket, Ticket]] = []
+        fresh, self.fresh = self.fresh, []
+        for ticket in fresh:
+            if self.waiting.get(ticket.name) is ticket:
+                self._search(ticket, now, pairs)
+
+        # Entries for players who were paired or left since are skipped here
+        while self.retries and self.retries[0][0] <= now:
+            ticket = heapq.heappop(self.retries)[2]
+            if self.waiting.get(ticket.name) is ticket:
+                self._search(ticket, now, pairs)
+
+        QUEUED.set(len(self.waiting))
+        return pairs
+
+    def _search(self, ticket: Ticket, now: int, pairs: List[Tuple[Ticket, Ticket]]):
+        opponent = self._find(ticket, self.window(ticket, now))
+        if opponent is None:
+            # Look again at the next widening step (at the cap too, for newcomers in range)
+            steps = (now - ticket.joined) // self.widen_every + 1
+            heapq.heappush(self.retries, (ticket.joined + steps * self.widen_every,
+                                          next(self.sequence), ticket))
+            return
+
+        self._remove(ticket)
+        self._remove(opponent)
+        pairs.append((ticket, opponent))
+        QUEUE_TIME.observe(now - ticket.joined)
+        QUEUE_TIME.observe(now - opponent.joined)
+        PAIRINGS.inc()
+
+    def _find(self, ticket: Ticket, window: int) -> Optional[Ticket]:
+        """Longest-waiting player in the closest bucket with someone inside the window"""
+        rating = ticket.rating
+        low = int((rating - window) // self.bucket_width)
+        high = int((rating + window) // self.bucket_width)
+        own = ticket.bucket
+        for distance in range(max(own - low, high - own) + 1):
+            for index in (own - distance, own + distance) if distance else (own,):
+                if not low <= index <= high:
+                    continue
+                bucket = self.buckets.get(index)
+                if not bucket:
+                    continue
+                # Whole buckets inside the window match on their oldest player; only
+                # the two edge buckets can hold players just out of range
+                for other in bucket.values():
+                    if other is not ticket and abs(other.rating - rating) <= window:
+                        return other
+        return None
+
+    def _remove(self, ticket: Ticket):
+        del self.waiting[ticket.name]
+        bucket = self.buckets[ticket.bucket]
+        del bucket[ticket.name]
+        if not bucket:
+            del self.buckets[ticket.bucket]
+
+
+def run_load_test(players: int = 100_000, duration: float = 600.0, poll_ms: int = 250,
+                  match_seconds: Tuple[float, float] = (60.0, 180.0), seed: int = 0, **options) -> Dict:
+    """Simulate a population queueing, playing and queueing again; report queue times and pairing cost.
+
+    Every player joins at once, so the first poll faces the whole population
+    queued. Results are drawn from hidden skills, which the ratings chase.
+    Queue times are simulated; pairing costs are measured wall-clock time.
+    """
+    import random
+    import time
+
+    rng = random.Random(seed)
+    skills = {f"player{i}": rng.gauss(DEFAULT_RATING, 300.0) for i in range(players)}
+    ratings = EloRatings()
+    matchmaker = Matchmaker(ratings, **options)
+    for name in skills:
+        matchmaker.enqueue(name, 0)
+
+    playing: List[Tuple[int, int, str, str]] = []  # (ends at, sequence, player 1, player 2)
+    sequence = itertools.count()
+    queue_times: List[int] = []
+    gaps: List[float] = []
+    poll_seconds = 0.0
+    slowest_poll = 0.0
+    peak_queued = 0
+    burst: Dict = {}
+
+    for now in range(0, int(duration * 1000) + 1, poll_ms):
+        while playing and playing[0][0] <= now:
+            ended, _, name1, name2 = heapq.heappop(playing)
+            winner = 1 if rng.random() < EloRatings.expected_score(skills[name1], skills[name2]) else 2
+            ratings.record_result(name1, name2, winner)
+            # Both go straight back in the queue, having waited since the match ended
+            matchmaker.enqueue(name1, ended)
+            matchmaker.enqueue(name2, ended)
+
+        queued = len(matchmaker)
+        peak_queued = max(peak_queued, queued)
+        start = time.perf_counter()
+        pairs = matchmaker.poll(now)
+        elapsed = time.perf_counter() - start
+        poll_seconds += elapsed
+        slowest_poll = max(slowest_poll, elapsed)
+        if not burst:
+            burst = {"burst_queued": queued, "burst_pairs": len(pairs), "burst_poll_ms": elapsed * 1000,
+                     "burst_us_per_pair": elapsed / max(1, len(pairs)) * 1e6}
+
+        for ticket, opponent in pairs:
+            queue_times += (now - ticket.joined, now - opponent.joined)
+            gaps.append(abs(ticket.rating - opponent.rating))
+            length = int(rng.uniform(*match_seconds) * 1000)
+            heapq.heappush(playing, (now + length, next(sequence), ticket.name, opponent.name))
+
+    # Players still waiting count with the time they have waited so far
+    queue_times += (now - ticket.joined for ticket in matchmaker.waiting.values())
+    queue_times.sort()
+    error = sum(abs(ratings.rating(name) - skill) for name, skill in skills.items()) / players
+    return {
+        "players": players,
+        "pairings": len(gaps),
+        "peak_queued": peak_queued,
+        "still_waiting": len(matchmaker),
+        **burst,
+        "us_per_pair": poll_seconds / max(1, len(gaps)) * 1e6,
+        "slowest_poll_ms": slowest_poll * 1000,
+        "queue_p50_s": percentile(queue_times, 0.50) / 1000,
+        "queue_p90_s": percentile(queue_times, 0.90) / 1000,
+        "queue_p99_s": percentile(queue_times, 0.99) / 1000,
+        "queue_max_s": queue_times[-1] / 1000 if queue_times else 0.0,
+        "mean_rating_gap": sum(gaps) / max(1, len(gaps)),
+        "mean_rating_error": error,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Matchmaking load generator")
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--duration", type=float, default=600.0, help="Simulated seconds")
+    parser.add_argument("--poll-ms", type=int, default=250, help="Simulated time between pairing passes")
+    parser.add_argument("--initial-window", type=int, default=50)
+    parser.add_argument("--max-window", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print_report(run_load_test(args.players, args.duration, args.poll_ms, seed=args.seed,
+                               initial_window=args.initial_window, max_window=args.max_window))
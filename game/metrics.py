@@ -0,0 +1,178 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+# Default histogram buckets, in milliseconds
+DEFAULT_BUCKETS = (1, 2, 4, 8, 12, 16, 20, 25, 33, 50, 100, 250)
+
+
+class Counter:
+    """Monotonically increasing count; inc() is a single attribute add"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        # Prometheus counters end in _total, and HELP/TYPE must use the sample's name
+        self.name = name if name.endswith("_total") else name + "_total"
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def samples(self) -> List[tuple]:
+        return [(self.name, "", self.value)]
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """A value that can go up and down"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self) -> List[tuple]:
+        return [(self.name, "", self.value)]
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Bucketed observations; observe() is a bisect plus two adds"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self) -> List[tuple]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            cumulative += count
+            samples.append((self.name + "_bucket", f'le="{bound}"', cumulative))
+        samples.append((self.name + "_sum", "", self.sum))
+        samples.append((self.name + "_count", "", cumulative))
+        return samples
+
+    def snapshot(self):
+        return {"buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+                "sum": self.sum, "count": self.count}
+
+
+class MetricsRegistry:
+    """Named metrics, rendered in Prometheus text format or as a JSON snapshot.
+
+    Metric updates are plain attribute arithmetic with no locking, which is
+    cheap enough for the game loop; readers may see a value mid-update at
+    worst one observation stale.
+    """
+
+    def __init__(self, prefix: str = "snake"):
+        self.prefix = prefix
+        self.metrics: Dict[str, object] = {}
+
+    def _register(self, cls, name: str, help_text: str, **kwargs):
+        full_name = f"{self.prefix}_{name}" if self.prefix else name
+        metric = self.metrics.get(full_name)
+        if metric is None:
+            metric = cls(full_name, help_text, **kwargs)
+            self.metrics[full_name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = "") -> Gauge:
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = "",
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                label_text = "{" + labels + "}" if labels else ""
+                lines.append(f"{sample_name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        return {name: metric.snapshot() for name, metric in list(self.metrics.items())}
+
+    def dump_json(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+
+# Registry shared by the game; tests and tools may create their own
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves a registry at /metrics over HTTP from a background thread"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9100):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    body = registry_ref.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path.split("?")[0] == "/metrics.json":
+                    body = json.dumps(registry_ref.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the game's console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread:
+            self.thread.join()
@@ -0,0 +1,248 @@
+import os
+import random
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pygame
+
+from .constants import *
+from .enums import Direction, GameState, PowerUpType
+from .entities import Snake, Food, PowerUp, Obstacle
+from .harness import map_on_workers, worker_game
+
+# Simulated matches advance game time in fixed steps, one rendered frame per step
+FRAME_MS = 1000 // 60
+
+
+def init_headless():
+    """Initialise pygame without a window (safe to call more than once)"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+
+
+def create_offscreen_game(**options):
+    """Create a Game that draws into an offscreen surface instead of a window"""
+    from .game import Game
+
+    init_headless()
+    return Game(screen=pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), 0, 32), **options)
+
+
+def pixel_format(surface: pygame.Surface) -> str:
+    """Name the surface's in-memory byte order the way ffmpeg's -pix_fmt does"""
+    masks = surface.get_masks()[:3]
+    if masks == (0xFF0000, 0x00FF00, 0x0000FF):
+        return "bgr0" if surface.get_bytesize() == 4 else "bgr24"
+    if masks == (0x0000FF, 0x00FF00, 0xFF0000):
+        return "rgb0" if surface.get_bytesize() == 4 else "rgb24"
+    raise ValueError(f"Unsupported surface masks: {masks}")
+
+
+def apply_snapshot(game, snapshot: Dict):
+    """Load a spectator snapshot into a Game so its draw methods can render it"""
+    # Recordings made before the clock was sent keep whatever time the game has
+    game.now = snapshot.get("now", game.now)
+    game.game_state = GameState(snapshot["state"])
+    game.player1_name, game.player2_name = snapshot["names"]
+    game.player1_wins, game.player2_wins = snapshot["wins"]
+    game.winner = snapshot["winner"]
+    game.game_over = game.game_state == GameState.GAME_OVER
+
+    snakes = []
+    for i, data in enumerate(snapshot["snakes"]):
+        snake = Snake(0, 0, DARK_GREEN if i == 0 else DARK_BLUE, i + 1)
+        snake.body = [tuple(segment) for segment in data["body"]]
+        snake.direction = Direction[data["direction"]]
+        snake.score = data["score"]
+        snake.alive = data["alive"]
+        snake.death_reason = data["death_reason"]
+        snake.death_time = data.get("death_time", 0)
+        if "boost_end" in data:
+            snake.speed_boost_end = data["boost_end"]
+        elif data["boost"]:
+            snake.speed_boost_end = game.now + 1000
+        snakes.append(snake)
+    # Recordings start on the name entry screen, before any snakes exist
+    game.snake1, game.snake2 = snakes or (None, None)
+    game.first_time = not snakes
+
+    game.food = None
+    if snapshot["food"] is not None:
+        game.food = Food()
+        game.food.x, game.food.y = snapshot["food"]
+
+    game.power_ups = []
+    for x, y, power_type in snapshot["power_ups"]:
+        powerup = PowerUp(PowerUpType(power_type))
+        powerup.x, powerup.y = x, y
+        game.power_ups.append(powerup)
+
+    game.obstacles = [Obstacle(x, y) for x, y in snapshot["obstacles"]]
+
+
+def simulate_match(game, seed: int, max_frames: int = 3600, turn_chance: float = 0.05) -> Iterator[int]:
+    """Play a random-input match on the game, yielding once per frame"""
+    rng = random.Random(seed)
+    directions = list(Direction)
+
+    # Game time starts at zero and the worker's Game may have played other
+    # matches, so reset everything carried between matches: only the seed counts
+    now = game.now = 0
+    game.reset_win_count()
+    game.first_death_time = 0
+    game.start_game(seed)
+    for frame in range(max_frames):
+        if game.game_state == GameState.GAME_OVER:
+            break
+        if rng.random() < turn_chance:
+            game.snake1.change_direction(rng.choice(directions))
+        if rng.random() < turn_chance:
+            game.snake2.change_direction(rng.choice(directions))
+        now += FRAME_MS
+        game.update(now)
+        yield frame
+
+
+class ImageSequenceSink:
+    """Saves every frame as a numbered image file (PNG by default)"""
+
+    def __init__(self, directory: str, extension: str = "png"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.extension = extension
+        self.frames = 0
+
+    def write(self, surface: pygame.Surface):
+        path = os.path.join(self.directory, f"frame_{self.frames:06d}.{self.extension}")
+        pygame.image.save(surface, path)
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+class RawVideoSink:
+    """Streams frames as raw pixels, e.g. to a file or an ffmpeg pipe.
+
+    Pixels are written straight from the surface's buffer without an
+    intermediate copy. Feed the result to ffmpeg with
+    ``-f rawvideo -pix_fmt <pixel_format> -s <width>x<height>``.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.frames = 0
+        self.pixel_format = None
+
+    def write(self, surface: pygame.Surface):
+        if self.pixel_format is None:
+            self.pixel_format = pixel_format(surface)
+        view = surface.get_view("0")  # Zero-copy view of the pixel buffer
+        self.file.write(view)
+        del view  # Release the surface lock
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+
+def open_sink(output: str, sink_format: str):
+    if sink_format == "raw":
+        return RawVideoSink(output)
+    return ImageSequenceSink(output, sink_format)
+
+
+def render_frames(game, frames: Iterator, sink, every: int = 1) -> int:
+    """Draw the game into its offscreen surface for each step and send it to the sink"""
+    rendered = 0
+    for index, snapshot in enumerate(frames):
+        if index % every:
+            continue
+        if isinstance(snapshot, dict):
+            apply_snapshot(game, snapshot)
+        game.draw_frame()
+        sink.write(game.screen)
+        rendered += 1
+    return rendered
+
+
+def render_job(job: Tuple) -> Tuple[str, int]:
+    """Render one match: ("simulate", seed, output, format, every) or ("recording", path, ...)"""
+    kind, source, output, sink_format, every = job
+    game = worker_game()
+
+    if kind == "simulate":
+        frames = simulate_match(game, source)
+    else:
+        from .spectator import read_recording
+        frames = read_recording(source)
+
+    sink = open_sink(output, sink_format)
+    try:
+        rendered = render_frames(game, frames, sink, every)
+    finally:
+        sink.close()
+    return output, rendered
+
+
+def run_recording_check(directory: str, seed: int = 0) -> Tuple[int, int]:
+    """Record a session the way --record does, from the name screen on, and render it back"""
+    from .spectator import MatchRecorder, SpectatorChannel, read_recording
+
+    path = os.path.join(directory, "check.bin")
+    channel = SpectatorChannel()
+    recorder = MatchRecorder(channel, path)
+    game = create_offscreen_game(spectators=channel)
+    game.publish_spectators()
+    for _ in simulate_match(game, seed):
+        game.publish_spectators()
+    recorder.close()
+
+    recorded = sum(1 for _ in read_recording(path))
+    _, rendered = render_job(("recording", path, os.path.join(directory, "check.raw"), "raw", 1))
+    return recorded, rendered
+
+
+def export_matches(jobs: Sequence[Tuple], workers: Optional[int] = None) -> List[Tuple[str, int]]:
+    """Render many matches in parallel, one process per core by default"""
+    return list(map_on_workers(render_job, jobs, workers))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Headless frame export for recorded or simulated matches")
+    parser.add_argument("--simulate", type=int, default=0, help="Number of seeded random matches to render")
+    parser.add_argument("--recording", nargs="*", default=[], help="Recorded spectator streams to render")
+    parser.add_argument("--out", default="export", help="Output directory")
+    parser.add_argument("--format", default="png", help="Image extension, or 'raw' for raw video")
+    parser.add_argument("--every", type=int, default=1, help="Keep every Nth frame")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--check", action="store_true",
+                        help="Record a session from the name screen on and check it renders")
+    args = parser.parse_args()
+
+    if args.check:
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            recorded, rendered = run_recording_check(directory)
+        print(f"Recorded {recorded} frames, rendered {rendered}")
+        raise SystemExit(0 if rendered > 1 and rendered == recorded else 1)
+
+    def target(name: str) -> str:
+        return os.path.join(args.out, name + (".raw" if args.format == "raw" else ""))
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = [("simulate", seed, target(f"match_{seed:05d}"), args.format, args.every)
+            for seed in range(args.simulate)]
+    jobs += [("recording", path, target(os.path.splitext(os.path.basename(path))[0]),
+              args.format, args.every) for path in args.recording]
+
+    start = time.perf_counter()
+    results = export_matches(jobs, args.workers)
+    elapsed = time.perf_counter() - start
+    frames = sum(rendered for _, rendered in results)
+    print(f"Rendered {frames} frames from {len(results)} matches in {elapsed:.1f}s "
+          f"({frames / elapsed:.0f} frames/s)")
@@ -0,0 +1,244 @@
+from typing import Callable, List, Optional, Tuple
+from .controls import is_reverse
+from .enums import Direction, PowerUpType
+from .grid import DIRECTION_INDEX, WALL, Board, get_board, to_cell
+
+# Time runs in half ticks, the speed-boosted move interval: snakes move every
+# second half tick, or every half tick while boosted, exactly like Game.update
+BOOST_HALF_TICKS = 3000 // 60
+
+
+class SnakeState:
+    """Renderer-free snake whose body can be shared between clones.
+
+    The body lives in an append-only log of head cells: log[start:end] holds
+    tail..head and ``extra`` counts duplicated tail cells left by growing.
+    Clones share the log; a clone that needs to append after another one has
+    already appended forks its own copy of just the live slice, so cloning is
+    O(1) and the unchanged middle of the body is never copied.
+    """
+
+    __slots__ = ("log", "start", "end", "extra", "direction", "score", "alive", "boost_end",
+                 "last_move", "hit_wall")
+
+    def __init__(self, cells: List[int], direction: Direction, score: int = 0,
+                 alive: bool = True, boost_end: int = 0, last_move: int = 0):
+        # Game bodies are head-first; the log is tail-first
+        tail = cells[-1]
+        extra = 0
+        while extra < len(cells) - 1 and cells[-2 - extra] == tail:
+            extra += 1
+        self.log = list(reversed(cells[:len(cells) - extra]))
+        self.start = 0
+        self.end = len(self.log)
+        self.extra = extra
+        self.direction = direction
+        self.score = score
+        self.alive = alive
+        self.boost_end = boost_end
+        self.last_move = last_move
+        self.hit_wall = False
+
+    def clone(self) -> 'SnakeState':
+        other = SnakeState.__new__(SnakeState)
+        other.log = self.log
+        other.start = self.start
+        other.end = self.end
+        other.extra = self.extra
+        other.direction = self.direction
+        other.score = self.score
+        other.alive = self.alive
+        other.boost_end = self.boost_end
+        other.last_move = self.last_move
+        other.hit_wall = self.hit_wall
+        return other
+
+    def __len__(self) -> int:
+        return self.end - self.start + self.extra
+
+    @property
+    def head(self) -> int:
+        return self.log[self.end - 1]
+
+    def cells(self) -> List[int]:
+        """Head-first body, in the same order as Snake.body"""
+        return self.log[self.end - 1:self.start - 1 if self.start else None:-1] + \
+            [self.log[self.start]] * self.extra
+
+    def occupies(self, cell: int, skip_head: bool = False) -> bool:
+        end = self.end - 1 if skip_head else self.end
+        if self.extra and self.log[self.start] == cell:
+            return True
+        try:
+            self.log.index(cell, self.start, end)
+        except ValueError:
+            return False
+        return True
+
+    def push_head(self, cell: int):
+        if len(self.log) != self.end:
+            # Another clone appended to the shared log first: fork the live slice
+            self.log = self.log[self.start:self.end]
+            self.end -= self.start
+            self.start = 0
+        self.log.append(cell)
+        self.end += 1
+
+    def pop_tail(self):
+        if self.extra:
+            self.extra -= 1
+        else:
+            self.start += 1
+
+    def moves_at(self, half_tick: int) -> bool:
+        """Whether the snake is due to move on this half tick (Game.get_speed's interval)"""
+        return half_tick - self.last_move >= (1 if half_tick < self.boost_end else 2)
+
+    def move(self, new_cell: int, grow: bool = False):
+        if not self.alive:
+            return
+        if new_cell == WALL:
+            self.hit_wall = True
+            return
+        self.push_head(new_cell)
+        if not grow:
+            self.pop_tail()
+
+    def change_direction(self, direction: Direction):
+        if not is_reverse(direction, self.direction):
+            self.direction = direction
+
+    def grow(self, segments: int):
+        self.extra += segments
+
+    def shrink(self, segments: int):
+        for _ in range(min(segments, len(self) - 1)):
+            self.pop_tail()
+
+
+class MatchState:
+    """Compact snapshot of a match that search bots can clone and step.
+
+    Obstacles are a frozenset and power-ups a tuple, so clones share them
+    until a step actually changes them. Food that gets eaten is not
+    respawned (its next position is unknowable), it is simply gone, unless
+    ``respawn_food`` is set to supply the next food cell.
+    """
+
+    __slots__ = ("snakes", "food", "power_ups", "obstacles", "board", "tick", "respawn_food")
+
+    def __init__(self, snakes: List[SnakeState], food: Optional[int],
+                 power_ups: Tuple[Tuple[int, PowerUpType], ...], obstacles: frozenset,
+                 board: Optional[Board] = None, tick: int = 0):
+        self.snakes = snakes
+        self.board = board or get_board()
+        self.food = food
+        self.power_ups = power_ups
+        self.obstacles = obstacles
+        self.tick = tick
+        self.respawn_food: Optional[Callable[[], Optional[int]]] = None
+
+    @classmethod
+    def from_game(cls, game, current_time: int = 0) -> 'MatchState':
+        snakes = []
+        half_tick = game.base_speed // 2
+        last_moves = (game.last_move_time1, game.last_move_time2)
+        for snake, last_move in zip((game.snake1, game.snake2), last_moves):
+            boost_ms = max(0, snake.speed_boost_end - current_time) if current_time else 0
+            elapsed = max(0, current_time - last_move) if current_time else 0
+            snakes.append(SnakeState(snake.body.cell_list(), snake.direction, snake.score, snake.alive,
+                                     -(-boost_ms // half_tick), -(elapsed // half_tick)))
+        food = to_cell(*game.food.get_position()) if game.food else None
+        power_ups = tuple((to_cell(pu.x, pu.y), pu.power_type) for pu in game.power_ups)
+        obstacles = frozenset(to_cell(obs.x, obs.y) for obs in game.obstacles)
+        return cls(snakes, food, power_ups, obstacles, game.board)
+
+    def clone(self) -> 'MatchState':
+        other = MatchState.__new__(MatchState)
+        other.snakes = [snake.clone() for snake in self.snakes]
+        other.food = self.food
+        other.power_ups = self.power_ups
+        other.obstacles = self.obstacles
+        other.board = self.board
+        other.tick = self.tick
+        other.respawn_food = self.respawn_food
+        return other
+
+    @property
+    def is_over(self) -> bool:
+        return not (self.snakes[0].alive and self.snakes[1].alive)
+
+    def step(self, direction1: Optional[Direction], direction2: Optional[Direction]):
+        """Advance one base-speed tick with the given turns (None keeps going straight)"""
+        for snake, direction in zip(self.snakes, (direction1, direction2)):
+            if direction is not None:
+                snake.change_direction(direction)
+
+        for half_tick in (2 * self.tick + 1, 2 * self.tick + 2):
+            movers = [snake.moves_at(half_tick) for snake in self.snakes]
+            if movers[0] or movers[1]:
+                self._move(movers, half_tick)
+                # The Game stops updating as soon as a death decides the match
+                if self.is_over:
+                    break
+        self.tick += 1
+
+    def _move(self, movers: List[bool], half_tick: int):
+        for snake, moves in zip(self.snakes, movers):
+            if not moves:
+                continue
+            snake.last_move = half_tick
+            new_cell = self.board.next_cell[snake.head][DIRECTION_INDEX[snake.direction]]
+            will_eat = new_cell == self.food
+            snake.move(new_cell, grow=will_eat)
+            if will_eat and snake.alive:
+                snake.score += 10
+                self.food = self.respawn_food() if self.respawn_food else None
+        self._collect_power_ups(half_tick)
+        self._check_collisions()
+
+    def _collect_power_ups(self, half_tick: int):
+        if not self.power_ups:
+            return
+        snake1, snake2 = self.snakes
+        remaining = []
+        for cell, power_type in self.power_ups:
+            if snake1.head == cell:
+                collector, other = snake1, snake2
+            elif snake2.head == cell:
+                collector, other = snake2, snake1
+            else:
+                remaining.append((cell, power_type))
+                continue
+
+            if power_type == PowerUpType.SPEED_BOOST:
+                collector.boost_end = half_tick + BOOST_HALF_TICKS
+            elif power_type == PowerUpType.GROW:
+                collector.grow(2)
+            elif power_type == PowerUpType.SHRINK_OPPONENT:
+                other.shrink(2)
+            collector.score += 5
+        if len(remaining) != len(self.power_ups):
+            self.power_ups = tuple(remaining)
+
+    def _check_collisions(self):
+        """Same rules and order as Game.check_collisions"""
+        snake1, snake2 = self.snakes
+        for snake in self.snakes:
+            if snake.alive and snake.occupies(snake.head, skip_head=True):
+                snake.alive = False
+
+        if snake1.alive and snake2.alive and snake1.head == snake2.head:
+            snake1.alive = snake2.alive = False
+        elif snake1.alive and snake2.occupies(snake1.head):
+            snake1.alive = False
+        elif snake2.alive and snake1.occupies(snake2.head):
+            snake2.alive = False
+
+        for snake in self.snakes:
+            if snake.alive and snake.head in self.obstacles:
+                snake.alive = False
+
+        for snake in self.snakes:
+            if snake.alive and snake.hit_wall:
+                snake.alive = False
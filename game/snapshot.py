@@ -0,0 +1,301 @@
+"""Save and resume in-progress matches.
+
+encode_snapshot() packs the full Game state into a small versioned binary
+blob: names, wins, both snakes with bodies, directions, boost and death
+timers, food, power-ups, obstacles and the game's RNG state. Times are
+stored relative to Game.now, so a resumed match continues exactly where it
+stopped on whatever clock the new process has. SnapshotWriter writes blobs
+from a background thread (temp file, fsync, rename), so a snapshot costs
+the game loop only the encoding.
+"""
+
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Optional
+
+from .constants import GRID_WIDTH, GRID_HEIGHT, DARK_GREEN, DARK_BLUE
+from .entities import Snake, Food, PowerUp, Obstacle
+from .entities.body import SnakeBody
+from .entities.powerup import POWERUP_TYPES
+from .fileio import LatestWriter, write_atomically
+from .enums import GameState
+from .grid import DIRECTIONS, DIRECTION_INDEX, from_cell, get_board, to_cell
+
+MAGIC = b"SNKS"
+VERSION = 1
+
+# Layout (network byte order), all times in ms relative to Game.now:
+#   header   magic, version, grid width, grid height
+#   game     state, flags (game over, walls, first time), wins 1 and 2, winner,
+#            ages of both last moves, the last power-up spawn and the first death
+#   names    two length-prefixed UTF-8 strings
+#   snakes   fixed fields, then length cells, the death reason and queued turns
+#   board    food cell, power-ups (cell, type), obstacle cells
+#   rng      Mersenne Twister state (625 words) and the cached gauss value
+#   crc32    over everything before it
+HEADER = struct.Struct("!4sHHH")
+GAME = struct.Struct("!BBIIBqqqq")
+SNAKE = struct.Struct("!BBiqqH")
+TURN = struct.Struct("!Bq")
+RNG = struct.Struct("!B?d")
+CRC = struct.Struct("!I")
+
+GAME_STATES = tuple(GameState)
+# Wire code for Game.winner: its index here (None while the match is still on)
+WINNER_CODES = (None, "Player 1 (Green)", "Player 2 (Blue)", "Tie")
+NO_FOOD = 0xFFFF
+
+GAME_OVER_FLAG, WALLS_FLAG, FIRST_TIME_FLAG = 1, 2, 4
+ALIVE_FLAG, HIT_WALL_FLAG = 1, 2
+
+
+class SnapshotError(ValueError):
+    """Raised for blobs that are truncated, corrupt or from an unknown version"""
+
+
+def _network_order(values: array) -> array:
+    """Byteswap a native-order array in place to network order (or back)"""
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def _pack_text(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return struct.pack("!H", len(data)) + data
+
+
+def encode_snapshot(game) -> bytes:
+    """Pack the game's full match state into a versioned binary blob"""
+    now = game.now
+    flags = ((GAME_OVER_FLAG if game.game_over else 0) | (WALLS_FLAG if game.walls else 0) |
+             (FIRST_TIME_FLAG if game.first_time else 0))
+    parts = [
+        HEADER.pack(MAGIC, VERSION, GRID_WIDTH, GRID_HEIGHT),
+        GAME.pack(GAME_STATES.index(game.game_state), flags, game.player1_wins, game.player2_wins,
+                  WINNER_CODES.index(game.winner), now - game.last_move_time1, now - game.last_move_time2,
+                  now - game.last_powerup_spawn, now - game.first_death_time),
+        _pack_text(game.player1_name),
+        _pack_text(game.player2_name),
+    ]
+
+    for snake, queue in ((game.snake1, game.input1), (game.snake2, game.input2)):
+        if snake is None:
+            # Nothing has been played yet: only names and wins matter
+            parts.append(SNAKE.pack(0, 0, 0, 0, 0, 0) + _pack_text("") + bytes(1))
+            continue
+        cells = snake.body.cell_array()
+        parts.append(SNAKE.pack(DIRECTION_INDEX[snake.direction],
+                                (ALIVE_FLAG if snake.alive else 0) | (HIT_WALL_FLAG if snake.hit_wall else 0),
+                                snake.score, snake.speed_boost_end - now, now - snake.death_time,
+                                len(cells)))
+        parts.append(_network_order(cells).tobytes())
+        parts.append(_pack_text(snake.death_reason))
+        parts.append(bytes([len(queue.turns)]))
+        parts += [TURN.pack(DIRECTION_INDEX[direction], now - pressed) for direction, pressed in queue.turns]
+
+    food = to_cell(game.food.x, game.food.y) if game.food else NO_FOOD
+    board = [food, len(game.power_ups)]
+    for powerup in game.power_ups:
+        board += [to_cell(powerup.x, powerup.y), POWERUP_TYPES.index(powerup.power_type)]
+    board.append(len(game.obstacles))
+    board += [to_cell(obstacle.x, obstacle.y) for obstacle in game.obstacles]
+    parts.append(struct.pack(f"!{len(board)}H", *board))
+
+    rng_version, words, gauss_next = game.rng.getstate()
+    parts.append(RNG.pack(rng_version, gauss_next is not None, gauss_next or 0.0))
+    parts.append(_network_order(array("I", words)).tobytes())
+
+    blob = b"".join(parts)
+    return blob + CRC.pack(zlib.crc32(blob))
+
+
+class _Reader:
+    """Cursor over a snapshot blob that turns short reads into SnapshotError"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout: struct.Struct) -> tuple:
+        if self.offset + layout.size > len(self.data):
+            raise SnapshotError("snapshot is truncated")
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def values(self, fmt: str, count: int) -> tuple:
+        return self.unpack(struct.Struct(f"!{count}{fmt}"))
+
+    def array(self, typecode: str, count: int) -> array:
+        values = array(typecode)
+        end = self.offset + count * values.itemsize
+        if end > len(self.data):
+            raise SnapshotError("snapshot is truncated")
+        values.frombytes(self.data[self.offset:end])
+        self.offset = end
+        return _network_order(values)
+
+    def text(self) -> str:
+        length, = self.unpack(struct.Struct("!H"))
+        end = self.offset + length
+        if end > len(self.data):
+            raise SnapshotError("snapshot is truncated")
+        text = self.data[self.offset:end].decode("utf-8")
+        self.offset = end
+        return text
+
+
+def restore_snapshot(game, data: bytes, now: Optional[int] = None):
+    """Load a blob from encode_snapshot() into a Game, resuming at time now (default: game.now)"""
+    if len(data) < HEADER.size + CRC.size:
+        raise SnapshotError("snapshot is truncated")
+    if CRC.unpack_from(data, len(data) - CRC.size)[0] != zlib.crc32(data[:-CRC.size]):
+        raise SnapshotError("snapshot checksum mismatch")
+
+    reader = _Reader(data[:-CRC.size])
+    magic, version, width, height = reader.unpack(HEADER)
+    if magic != MAGIC:
+        raise SnapshotError("not a snake snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    if (width, height) != (GRID_WIDTH, GRID_HEIGHT):
+        raise SnapshotError(f"snapshot is for a {width}x{height} grid")
+
+    if now is None:
+        now = game.now
+    (state, flags, wins1, wins2, winner, move_age1, move_age2,
+     powerup_age, first_death_age) = reader.unpack(GAME)
+    player1_name = reader.text()
+    player2_name = reader.text()
+
+    walls = bool(flags & WALLS_FLAG)
+    board = get_board(wrap=not walls)
+    snakes = []
+    turns = []
+    for player_id, color in ((1, DARK_GREEN), (2, DARK_BLUE)):
+        direction, snake_flags, score, boost_left, death_age, length = reader.unpack(SNAKE)
+        cells = reader.array("H", length)
+        death_reason = reader.text()
+        turn_count, = reader.values("B", 1)
+        turns.append([reader.unpack(TURN) for _ in range(turn_count)])
+        if not length:
+            snakes.append(None)
+            continue
+        snake = Snake(0, 0, color, player_id, board)
+        snake.body = SnakeBody.from_cells(cells)
+        snake.direction = DIRECTIONS[direction]
+        snake.alive = bool(snake_flags & ALIVE_FLAG)
+        snake.hit_wall = bool(snake_flags & HIT_WALL_FLAG)
+        snake.score = score
+        snake.speed_boost_end = now + boost_left
+        snake.death_time = now - death_age
+        snake.death_reason = death_reason
+        snakes.append(snake)
+
+    food, powerup_count = reader.values("H", 2)
+    power_ups = [reader.values("H", 2) for _ in range(powerup_count)]
+    obstacle_count, = reader.values("H", 1)
+    obstacles = [Obstacle(*from_cell(cell)) for cell in reader.values("H", obstacle_count)]
+
+    rng_version, has_gauss, gauss_next = reader.unpack(RNG)
+    words = tuple(reader.array("I", 625))
+    if reader.offset != len(reader.data):
+        raise SnapshotError("unexpected data after snapshot")
+
+    # Everything parsed: only now touch the game, so a bad blob leaves it unchanged
+    game.now = now
+    game.walls = walls
+    game.board = board
+    game.game_state = GAME_STATES[state]
+    game.game_over = bool(flags & GAME_OVER_FLAG)
+    game.first_time = bool(flags & FIRST_TIME_FLAG)
+    game.input_active = game.game_state == GameState.NAME_INPUT
+    game.player1_wins, game.player2_wins = wins1, wins2
+    game.winner = WINNER_CODES[winner]
+    game.player1_name, game.player2_name = player1_name, player2_name
+    game.snake1, game.snake2 = snakes
+    game.food = None
+    if food != NO_FOOD:
+        game.food = Food(game.rng)
+        game.food.x, game.food.y = from_cell(food)
+    game.power_ups = []
+    for cell, power_type in power_ups:
+        powerup = PowerUp(POWERUP_TYPES[power_type], game.rng)
+        powerup.x, powerup.y = from_cell(cell)
+        game.power_ups.append(powerup)
+    game.obstacles = obstacles
+    game.last_move_time1 = now - move_age1
+    game.last_move_time2 = now - move_age2
+    game.last_powerup_spawn = now - powerup_age
+    game.first_death_time = now - first_death_age
+    for queue, queued in zip((game.input1, game.input2), turns):
+        queue.clear()
+        queue.turns.extend((DIRECTIONS[direction], now - age) for direction, age in queued)
+    game.rng.setstate((rng_version, words, gauss_next if has_gauss else None))
+
+
+def save_snapshot(game, path: str):
+    write_atomically(path, encode_snapshot(game))
+
+
+def load_snapshot(game, path: str, now: Optional[int] = None) -> bool:
+    """Resume from the snapshot at path; returns False if there is none"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return False
+    restore_snapshot(game, data, now)
+    return True
+
+
+class SnapshotWriter(LatestWriter):
+    """Writes the latest submitted snapshot from a background thread.
+
+    submit() only swaps in the new blob; if the disk is slower than the
+    snapshots, older unwritten ones are skipped rather than queued.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path, name="snapshot-writer", label="Autosave")
+
+
+def run_benchmark(rounds: int = 2000, length: int = 200):
+    """Time encoding and decoding a snapshot of a mid-match game with long snakes"""
+    from .render import create_offscreen_game
+
+    game = create_offscreen_game()
+    game.now = 0
+    game.start_game(1)
+    for snake in (game.snake1, game.snake2):
+        snake.grow(length - 1)
+    game.spawn_powerup()
+    game.spawn_powerup()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        data = encode_snapshot(game)
+    encode_us = (time.perf_counter() - start) / rounds * 1e6
+
+    restored = create_offscreen_game()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        restore_snapshot(restored, data)
+    decode_us = (time.perf_counter() - start) / rounds * 1e6
+
+    return {
+        "snapshot_bytes": len(data),
+        "encode_us": encode_us,
+        "decode_us": decode_us,
+        "round_trip_equal": encode_snapshot(restored) == data,
+    }
+
+
+if __name__ == "__main__":
+    from .harness import print_report
+
+    print_report(run_benchmark(), width=16, precision=1)
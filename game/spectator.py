@@ -0,0 +1,604 @@
+import json
+import selectors
+import socket
+import struct
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+# Frame layout on the wire: 4-byte payload length, 1-byte frame kind, JSON payload
+FRAME_HEADER = struct.Struct("!IB")
+KEYFRAME = 0
+DELTA = 1
+
+# How many leading cells a move may add to a body before we send it in full
+MAX_HEAD_CELLS = 4
+
+
+def snapshot_game(game) -> Dict:
+    """Capture the parts of the match that spectators need to draw it"""
+    snapshot = {
+        "now": game.now,  # Game clock, which drives blinking, pulsing and glowing
+        "state": game.game_state.value,
+        "names": [game.player1_name, game.player2_name],
+        "wins": [game.player1_wins, game.player2_wins],
+        "winner": game.winner,
+        "snakes": [],
+        "food": list(game.food.get_position()) if game.food else None,
+        "power_ups": [[pu.x, pu.y, pu.power_type.value] for pu in game.power_ups],
+        "obstacles": [[obs.x, obs.y] for obs in game.obstacles],
+    }
+
+    for snake in (game.snake1, game.snake2):
+        if snake is None:
+            continue
+        snapshot["snakes"].append({
+            "body": list(map(list, snake.body)),
+            "direction": snake.direction.name,
+            "score": snake.score,
+            "alive": snake.alive,
+            "boost": snake.has_speed_boost(game.now),
+            "boost_end": snake.speed_boost_end,
+            "death_time": snake.death_time,
+            "death_reason": snake.death_reason,
+        })
+
+    return snapshot
+
+
+def diff_body(old: List[List[int]], new: List[List[int]]) -> Dict:
+    """Describe a body change as new head cells plus the resulting length"""
+    if old:
+        for added in range(min(MAX_HEAD_CELLS, len(new)) + 1):
+            if apply_body_delta(old, {"head": new[:added], "length": len(new)}) == new:
+                return {"head": new[:added], "length": len(new)}
+    return {"body": new}
+
+
+def apply_body_delta(old: List[List[int]], delta: Dict) -> List[List[int]]:
+    """Rebuild a body from the previous one and a delta from diff_body"""
+    if "body" in delta:
+        return delta["body"]
+
+    body = delta["head"] + old
+    length = delta["length"]
+    if len(body) > length:
+        return body[:length]
+
+    # Growth duplicates the tail cell, exactly like Snake.grow
+    return body + [body[-1]] * (length - len(body))
+
+
+def diff_snapshots(old: Dict, new: Dict) -> Dict:
+    """Return only the fields that changed between two snapshots"""
+    delta = {}
+    for key, value in new.items():
+        if key == "snakes":
+            continue
+        if old.get(key) != value:
+            delta[key] = value
+
+    snakes = []
+    for i, snake in enumerate(new["snakes"]):
+        old_snake = old["snakes"][i] if i < len(old["snakes"]) else {}
+        changed = {key: value for key, value in snake.items()
+                   if key != "body" and old_snake.get(key) != value}
+        if old_snake.get("body") != snake["body"]:
+            changed["body"] = diff_body(old_snake.get("body", []), snake["body"])
+        snakes.append(changed)
+
+    if len(new["snakes"]) != len(old["snakes"]) or any(snakes):
+        delta["snakes"] = snakes
+    return delta
+
+
+def apply_delta(snapshot: Dict, delta: Dict) -> Dict:
+    """Apply a delta from diff_snapshots to a snapshot, returning the new one"""
+    result = dict(snapshot)
+    for key, value in delta.items():
+        if key != "snakes":
+            result[key] = value
+
+    if "snakes" in delta:
+        snakes = []
+        for i, changed in enumerate(delta["snakes"]):
+            snake = dict(snapshot["snakes"][i]) if i < len(snapshot["snakes"]) else {"body": []}
+            for key, value in changed.items():
+                if key == "body":
+                    snake["body"] = apply_body_delta(snake["body"], value)
+                else:
+                    snake[key] = value
+            snakes.append(snake)
+        result["snakes"] = snakes
+    return result
+
+
+def encode_frame(kind: int, payload: Dict) -> bytes:
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(data), kind) + data
+
+
+class FrameDecoder:
+    """Client-side reassembly of frames into the current match snapshot"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.snapshot: Optional[Dict] = None
+        self.keyframes = 0
+        self.deltas = 0
+
+    def feed(self, data: bytes, max_frames: Optional[int] = None) -> int:
+        """Consume received bytes, returning how many complete frames were applied"""
+        self.buffer += data
+        applied = 0
+        while len(self.buffer) >= FRAME_HEADER.size and applied != max_frames:
+            length, kind = FRAME_HEADER.unpack_from(self.buffer)
+            end = FRAME_HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            payload = json.loads(bytes(self.buffer[FRAME_HEADER.size:end]))
+            del self.buffer[:end]
+
+            if kind == KEYFRAME:
+                self.snapshot = payload
+                self.keyframes += 1
+            elif self.snapshot is not None:  # Deltas before the first keyframe are useless
+                self.snapshot = apply_delta(self.snapshot, payload)
+                self.deltas += 1
+            applied += 1
+        return applied
+
+
+class Subscriber:
+    """A read-only viewer with its own bounded outgoing frame queue"""
+
+    def __init__(self, max_queue: int):
+        self.queue = deque()
+        self.max_queue = max_queue
+        self.needs_keyframe = True
+        self.resyncs = 0
+        self.closed = False
+
+
+class SpectatorChannel:
+    """Encodes each tick once and fans the same bytes out to every subscriber.
+
+    Publishing never blocks: a subscriber whose queue is full has its backlog
+    dropped and is resynchronised with a keyframe instead.
+    """
+
+    def __init__(self, max_queue: int = 64):
+        self.max_queue = max_queue
+        self.subscribers: List[Subscriber] = []
+        self.lock = threading.Lock()
+        self.last_snapshot: Optional[Dict] = None
+        self.last_keyframe: Optional[bytes] = None
+        self.publish_listeners = []  # Called after frames are queued, e.g. to wake a server
+
+        # Statistics
+        self.ticks_published = 0
+        self.frames_queued = 0
+        self.resyncs = 0
+
+    def subscribe(self) -> Subscriber:
+        """Add a viewer; it starts from the latest state even if nothing is being published"""
+        subscriber = Subscriber(self.max_queue)
+        with self.lock:
+            # Menus and the game over screen publish only on key presses, so
+            # don't leave a new viewer waiting for the next change
+            if self.last_snapshot is not None:
+                subscriber.queue.append(self._keyframe())
+                subscriber.needs_keyframe = False
+                self.frames_queued += 1
+            self.subscribers = self.subscribers + [subscriber]
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.closed = True
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscriber]
+
+    def _keyframe(self) -> bytes:
+        """The latest snapshot as a keyframe, encoded at most once per snapshot"""
+        if self.last_keyframe is None:
+            self.last_keyframe = encode_frame(KEYFRAME, self.last_snapshot)
+        return self.last_keyframe
+
+    def publish(self, game):
+        """Queue this tick's state change for all subscribers"""
+        snapshot = snapshot_game(game)
+        # Held so a viewer subscribing mid-publish can't get a delta against the wrong state
+        with self.lock:
+            queued = self._publish(snapshot)
+        if queued:
+            for listener in self.publish_listeners:
+                listener()
+
+    def _publish(self, snapshot: Dict) -> bool:
+        """Fan the snapshot out; False if no subscriber got a frame"""
+        previous = self.last_snapshot
+        delta_frame = None
+        if previous is not None:
+            delta = diff_snapshots(previous, snapshot)
+            if not delta:
+                # Nothing changed, but viewers waiting to resync still need a keyframe
+                waiting = [subscriber for subscriber in self.subscribers if subscriber.needs_keyframe]
+                for subscriber in waiting:
+                    subscriber.queue.clear()
+                    subscriber.queue.append(self._keyframe())
+                    subscriber.needs_keyframe = False
+                    self.frames_queued += 1
+                return bool(waiting)
+            delta_frame = encode_frame(DELTA, delta)
+        self.last_snapshot = snapshot
+        self.last_keyframe = None
+
+        for subscriber in self.subscribers:
+            if subscriber.needs_keyframe or delta_frame is None or \
+                    len(subscriber.queue) >= subscriber.max_queue:
+                if not subscriber.needs_keyframe:
+                    # Slow client: drop its backlog rather than stall the tick
+                    subscriber.resyncs += 1
+                    self.resyncs += 1
+                subscriber.queue.clear()
+                subscriber.queue.append(self._keyframe())
+                subscriber.needs_keyframe = False
+            else:
+                subscriber.queue.append(delta_frame)
+            self.frames_queued += 1
+
+        self.ticks_published += 1
+        return True
+
+
+class SpectatorServer:
+    """Serves a SpectatorChannel to TCP viewers from a background thread"""
+
+    def __init__(self, channel: SpectatorChannel, host: str = "127.0.0.1", port: int = 0,
+                 backlog: int = 1024):
+        self.channel = channel
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(backlog)
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+
+        # Self-pipe so publish() can wake the network thread
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+
+        self.selector.register(self.listener, selectors.EVENT_READ, None)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ, None)
+        self.connections: Dict[socket.socket, List] = {}  # socket -> [subscriber, pending bytes]
+        self.running = False
+        self.thread = None
+        channel.publish_listeners.append(self.wake)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name="spectator-server", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.channel.publish_listeners.remove(self.wake)
+        self.wake()
+        if self.thread:
+            self.thread.join()
+        for sock in list(self.connections):
+            self.drop(sock)
+        self.selector.close()
+        self.listener.close()
+        self.wake_reader.close()
+        self.wake_writer.close()
+
+    def wake(self):
+        try:
+            self.wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # A wake-up is already pending
+
+    def serve(self):
+        while self.running:
+            for key, events in self.selector.select(timeout=0.5):
+                sock = key.fileobj
+                if sock is self.listener:
+                    self.accept()
+                elif sock is self.wake_reader:
+                    try:
+                        while self.wake_reader.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif events & selectors.EVENT_READ:
+                    self.read(sock)
+                if events & selectors.EVENT_WRITE and sock in self.connections:
+                    self.flush(sock)
+
+            # Push freshly queued frames; sockets that would block wait for EVENT_WRITE
+            for sock in list(self.connections):
+                self.flush(sock)
+
+    def accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except (BlockingIOError, OSError):
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections[sock] = [self.channel.subscribe(), b""]
+            self.selector.register(sock, selectors.EVENT_READ, None)
+
+    def read(self, sock: socket.socket):
+        try:
+            data = sock.recv(4096)  # Viewers are read-only; anything they send is ignored
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(sock)
+
+    def flush(self, sock: socket.socket):
+        connection = self.connections.get(sock)
+        if connection is None:
+            return
+        subscriber, pending = connection
+
+        while True:
+            if not pending:
+                try:
+                    pending = memoryview(subscriber.queue.popleft())
+                except IndexError:
+                    break
+            try:
+                sent = sock.send(pending)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.drop(sock)
+                return
+            pending = pending[sent:]
+
+        connection[1] = pending
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+        if self.selector.get_key(sock).events != events:
+            self.selector.modify(sock, events, None)
+
+    def drop(self, sock: socket.socket):
+        connection = self.connections.pop(sock, None)
+        if connection:
+            self.channel.unsubscribe(connection[0])
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+
+class MatchRecorder:
+    """Writes a channel's frames to a file from a background thread.
+
+    The file is the same stream a TCP viewer receives, so it can be replayed
+    with read_recording().
+    """
+
+    def __init__(self, channel: SpectatorChannel, path: str, max_queue: int = 4096):
+        self.channel = channel
+        self.file = open(path, "wb")
+        self.subscriber = channel.subscribe()
+        self.subscriber.max_queue = max_queue
+        self.wakeup = threading.Event()
+        self.running = True
+        channel.publish_listeners.append(self.wakeup.set)
+        self.thread = threading.Thread(target=self._write_loop, name="match-recorder", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.channel.publish_listeners.remove(self.wakeup.set)
+        self.channel.unsubscribe(self.subscriber)
+        self.running = False
+        self.wakeup.set()
+        self.thread.join()
+        self.file.close()
+
+    def _write_loop(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            while True:
+                try:
+                    frame = self.subscriber.queue.popleft()
+                except IndexError:  # Drained, or publish() cleared it for a keyframe resync
+                    break
+                self.file.write(frame)
+            if not self.running:
+                break
+
+
+def read_recording(path: str, chunk_size: int = 65536):
+    """Yield the match snapshot after every frame of a recorded stream"""
+    decoder = FrameDecoder()
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(chunk_size)
+            if not data:
+                break
+            # Apply one frame at a time so no intermediate snapshot is skipped
+            decoder.buffer += data
+            while decoder.feed(b"", max_frames=1):
+                if decoder.snapshot is not None:
+                    yield decoder.snapshot
+
+
+def _viewer_swarm(address, viewers: int, slow_fraction: float, decoded_viewers: int,
+                  ready, stop, results):
+    """Connect many loopback viewers and drain them until told to stop"""
+    selector = selectors.DefaultSelector()
+    decoders = {}
+    received = 0
+    slow_sockets = []
+    slow_count = int(viewers * slow_fraction)
+
+    for i in range(viewers):
+        sock = socket.create_connection(address)
+        if i < slow_count:
+            # Slow viewers never read, so the server must drop them to keyframes
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            slow_sockets.append(sock)
+            continue
+        sock.setblocking(False)
+        decoder = FrameDecoder() if len(decoders) < decoded_viewers else None
+        if decoder:
+            decoders[sock] = decoder
+        selector.register(sock, selectors.EVENT_READ, decoder)
+    ready.set()
+
+    while not stop.is_set():
+        for key, _ in selector.select(timeout=0.1):
+            try:
+                data = key.fileobj.recv(65536)
+            except BlockingIOError:
+                continue
+            received += len(data)
+            if key.data is not None:
+                key.data.feed(data)
+
+    results.put({
+        "bytes_received": received,
+        "snapshots": [decoder.snapshot for decoder in decoders.values()],
+        "keyframes": [decoder.keyframes for decoder in decoders.values()],
+    })
+    for key in list(selector.get_map().values()):
+        key.fileobj.close()
+    for sock in slow_sockets:
+        sock.close()
+
+
+def _ensure_open_files(needed: int):
+    """Raise the soft open-file limit to needed, or fail before any viewer connects"""
+    try:
+        import resource
+    except ImportError:  # Not on POSIX; nothing to adjust
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY or soft >= needed:
+        return
+    if hard != resource.RLIM_INFINITY and hard < needed:
+        raise RuntimeError(f"The load test needs {needed} open files but the hard limit is {hard}; "
+                           f"raise it (ulimit -Hn) or use fewer --viewers")
+    resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+
+def run_load_test(viewers: int = 5000, ticks: int = 600, fps: int = 60,
+                  slow_fraction: float = 0.02, decoded_viewers: int = 8) -> Dict:
+    """Simulate a match broadcast to many loopback viewers and measure tick jitter"""
+    import multiprocessing
+    import os
+    import random
+    import statistics
+    import time
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from .enums import Direction, GameState
+    from .game import Game
+    from .harness import percentile
+
+    pygame.init()
+    # Server and swarm each hold one socket per viewer; the swarm inherits the limit
+    _ensure_open_files(viewers + 256)
+    channel = SpectatorChannel()
+    server = SpectatorServer(channel)
+    server.start()
+
+    ready = multiprocessing.Event()
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    swarm = multiprocessing.Process(
+        target=_viewer_swarm,
+        args=(server.address, viewers, slow_fraction, decoded_viewers, ready, stop, results))
+    swarm.start()
+    # Never wait forever on a swarm that died while connecting (EMFILE and the like)
+    while not ready.wait(timeout=0.5) or len(server.connections) < viewers:
+        if not swarm.is_alive():
+            server.stop()
+            raise RuntimeError(f"Viewer swarm exited with code {swarm.exitcode} "
+                               f"after {len(server.connections)} of {viewers} viewers connected")
+        time.sleep(0.05)
+
+    game = Game(spectators=channel)
+    game.start_game()
+    directions = list(Direction)
+    tick_interval = 1.0 / fps
+    intervals = []
+    publish_times = []
+
+    next_tick = time.perf_counter()
+    last_start = None
+    for _ in range(ticks):
+        start = time.perf_counter()
+        if last_start is not None:
+            intervals.append(start - last_start)
+        last_start = start
+
+        if game.game_state == GameState.GAME_OVER:
+            game.restart_game()
+        if random.random() < 0.05:
+            game.snake1.change_direction(random.choice(directions))
+            game.snake2.change_direction(random.choice(directions))
+        game.update(pygame.time.get_ticks())
+
+        publish_start = time.perf_counter()
+        channel.publish(game)
+        publish_times.append(time.perf_counter() - publish_start)
+
+        next_tick += tick_interval
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    time.sleep(0.5)  # Let the network thread drain the final frames
+    stop.set()
+    swarm_results = results.get(timeout=60)
+    swarm.join()
+    server.stop()
+
+    jitter = sorted(abs(interval - tick_interval) * 1000 for interval in intervals)
+    publish_times.sort()
+    final = channel.last_snapshot
+    return {
+        "viewers": viewers,
+        "ticks": ticks,
+        "target_tick_ms": tick_interval * 1000,
+        "mean_tick_ms": statistics.mean(intervals) * 1000,
+        "jitter_mean_ms": statistics.mean(jitter),
+        "jitter_p99_ms": percentile(jitter, 0.99),
+        "jitter_max_ms": max(jitter),
+        "publish_p50_ms": percentile(publish_times, 0.5) * 1000,
+        "publish_p99_ms": percentile(publish_times, 0.99) * 1000,
+        "frames_queued": channel.frames_queued,
+        "resyncs": channel.resyncs,
+        "bytes_received": swarm_results["bytes_received"],
+        "decoded_in_sync": sum(1 for s in swarm_results["snapshots"] if s == final),
+        "decoded_viewers": len(swarm_results["snapshots"]),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Spectator broadcast load test")
+    parser.add_argument("--viewers", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--slow-fraction", type=float, default=0.02)
+    args = parser.parse_args()
+
+    from .harness import print_report
+
+    print_report(run_load_test(args.viewers, args.ticks, args.fps, args.slow_fraction))
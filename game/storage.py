@@ -0,0 +1,284 @@
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    ties INTEGER NOT NULL DEFAULT 0,
+    matches INTEGER NOT NULL DEFAULT 0,
+    best_score INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    player1_id INTEGER NOT NULL REFERENCES players(id),
+    player2_id INTEGER NOT NULL REFERENCES players(id),
+    score1 INTEGER NOT NULL,
+    score2 INTEGER NOT NULL,
+    winner_id INTEGER REFERENCES players(id),
+    death_reason1 TEXT NOT NULL,
+    death_reason2 TEXT NOT NULL
+);
+-- Running totals per pair (player_a < player_b) so head-to-head lookups never scan matches
+CREATE TABLE IF NOT EXISTS head_to_head (
+    player_a INTEGER NOT NULL,
+    player_b INTEGER NOT NULL,
+    wins_a INTEGER NOT NULL DEFAULT 0,
+    wins_b INTEGER NOT NULL DEFAULT 0,
+    ties INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (player_a, player_b)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_leaderboard ON players (wins DESC, matches ASC);
+CREATE INDEX IF NOT EXISTS matches_player1 ON matches (player1_id, played_at);
+CREATE INDEX IF NOT EXISTS matches_player2 ON matches (player2_id, played_at);
+"""
+
+_STOP = object()
+
+
+class MatchHistory:
+    """SQLite-backed player profiles and match results.
+
+    record_match() only enqueues; a background writer thread commits queued
+    results in batched transactions, so the game loop never waits on disk.
+    Per-player and per-pair totals are maintained incrementally alongside
+    each batch, which keeps leaderboard and head-to-head queries index-only.
+    """
+
+    def __init__(self, path: str, batch_size: int = 512, flush_interval: float = 0.25):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue()
+        self.failed_matches = 0
+
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        # Queries run on their own connection; WAL lets them proceed while the writer commits
+        self.reader = sqlite3.connect(path, check_same_thread=False)
+        self.reader_lock = threading.Lock()
+
+        self.writer = threading.Thread(target=self._write_loop, name="match-history-writer", daemon=True)
+        self.writer.start()
+
+    def record_match(self, player1: str, player2: str, score1: int, score2: int,
+                     winner: Optional[int], death_reason1: str = "", death_reason2: str = "",
+                     played_at: Optional[float] = None):
+        """Queue a finished match; winner is 1, 2 or None for a tie"""
+        self.pending.put((played_at if played_at is not None else time.time(),
+                          player1, player2, score1, score2, winner,
+                          death_reason1, death_reason2))
+
+    def flush(self):
+        """Block until every queued match has been committed"""
+        self.pending.join()
+
+    def close(self):
+        self.pending.put(_STOP)
+        self.writer.join()
+        self.reader.close()
+
+    def leaderboard(self, limit: int = 10) -> List[Dict]:
+        rows = self._query(
+            "SELECT name, wins, losses, ties, matches, best_score FROM players "
+            "ORDER BY wins DESC, matches ASC LIMIT ?", (limit,))
+        return [dict(zip(("name", "wins", "losses", "ties", "matches", "best_score"), row))
+                for row in rows]
+
+    def head_to_head(self, player1: str, player2: str) -> Tuple[int, int, int]:
+        """Return (player1 wins, player2 wins, ties) between two named players"""
+        rows = self._query("SELECT id, name FROM players WHERE name IN (?, ?)", (player1, player2))
+        ids = {name: player_id for player_id, name in rows}
+        if player1 not in ids or player2 not in ids:
+            return (0, 0, 0)
+
+        id1, id2 = ids[player1], ids[player2]
+        rows = self._query(
+            "SELECT wins_a, wins_b, ties FROM head_to_head WHERE player_a = ? AND player_b = ?",
+            (min(id1, id2), max(id1, id2)))
+        if not rows:
+            return (0, 0, 0)
+        wins_a, wins_b, ties = rows[0]
+        return (wins_a, wins_b, ties) if id1 < id2 else (wins_b, wins_a, ties)
+
+    def recent_matches(self, player: str, limit: int = 10) -> List[Dict]:
+        rows = self._query(
+            "SELECT played_at, p1.name, p2.name, score1, score2, w.name, death_reason1, death_reason2 "
+            "FROM (SELECT * FROM matches WHERE player1_id = (SELECT id FROM players WHERE name = ?1) "
+            "      UNION ALL "
+            "      SELECT * FROM matches WHERE player2_id = (SELECT id FROM players WHERE name = ?1) "
+            "      AND player1_id != player2_id "  # A player who met their own name is already listed once
+            "      ORDER BY played_at DESC LIMIT ?2) AS m "
+            "JOIN players p1 ON p1.id = m.player1_id "
+            "JOIN players p2 ON p2.id = m.player2_id "
+            "LEFT JOIN players w ON w.id = m.winner_id "
+            "ORDER BY played_at DESC", (player, limit))
+        keys = ("played_at", "player1", "player2", "score1", "score2", "winner",
+                "death_reason1", "death_reason2")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self.reader_lock:
+            return self.reader.execute(sql, params).fetchall()
+
+    def _write_loop(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        player_ids: Dict[str, int] = {}
+
+        while True:
+            batch = [self.pending.get()]
+            stop = batch[0] is _STOP
+            if not stop:
+                # Give a burst of results a moment to accumulate into one transaction
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    try:
+                        item = self.pending.get(timeout=timeout) if timeout > 0 else self.pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    if item is _STOP:
+                        stop = True
+                        break
+
+            matches = [item for item in batch if item is not _STOP]
+            try:
+                if matches:
+                    with connection:
+                        self._write_batch(connection, player_ids, matches)
+            except Exception as e:
+                # Lose this batch, not the writer: later results are still saved and
+                # flush() and close() still return
+                self.failed_matches += len(matches)
+                player_ids.clear()  # Ids created in the rolled-back transaction are gone
+                print(f"Match history: could not save {len(matches)} matches: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+            if stop:
+                break
+
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, player_ids: Dict[str, int],
+                     matches: List[tuple]):
+        # Resolve player ids, creating profiles for new names
+        for match in matches:
+            for name in (match[1], match[2]):
+                if name not in player_ids:
+                    connection.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (name,))
+                    player_ids[name] = connection.execute(
+                        "SELECT id FROM players WHERE name = ?", (name,)).fetchone()[0]
+
+        rows = []
+        player_totals: Dict[int, List[int]] = {}  # id -> [wins, losses, ties, matches, best]
+        pair_totals: Dict[Tuple[int, int], List[int]] = {}  # (a, b) -> [wins_a, wins_b, ties]
+
+        for played_at, name1, name2, score1, score2, winner, reason1, reason2 in matches:
+            id1, id2 = player_ids[name1], player_ids[name2]
+            winner_id = id1 if winner == 1 else id2 if winner == 2 else None
+            rows.append((played_at, id1, id2, score1, score2, winner_id, reason1, reason2))
+
+            if id1 == id2:
+                # Both snakes under one name: one match for that player, neither won nor lost
+                totals = player_totals.setdefault(id1, [0, 0, 0, 0, 0])
+                totals[3] += 1
+                totals[4] = max(totals[4], score1, score2)
+                continue
+
+            for player_id, score in ((id1, score1), (id2, score2)):
+                totals = player_totals.setdefault(player_id, [0, 0, 0, 0, 0])
+                if winner_id is None:
+                    totals[2] += 1
+                elif winner_id == player_id:
+                    totals[0] += 1
+                else:
+                    totals[1] += 1
+                totals[3] += 1
+                totals[4] = max(totals[4], score)
+
+            pair = (min(id1, id2), max(id1, id2))
+            totals = pair_totals.setdefault(pair, [0, 0, 0])
+            if winner_id is None:
+                totals[2] += 1
+            elif winner_id == pair[0]:
+                totals[0] += 1
+            else:
+                totals[1] += 1
+
+        connection.executemany(
+            "INSERT INTO matches (played_at, player1_id, player2_id, score1, score2, winner_id, "
+            "death_reason1, death_reason2) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        connection.executemany(
+            "UPDATE players SET wins = wins + ?, losses = losses + ?, ties = ties + ?, "
+            "matches = matches + ?, best_score = MAX(best_score, ?) WHERE id = ?",
+            [(*totals, player_id) for player_id, totals in player_totals.items()])
+        connection.executemany(
+            "INSERT INTO head_to_head (player_a, player_b, wins_a, wins_b, ties) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (player_a, player_b) DO UPDATE SET wins_a = wins_a + excluded.wins_a, "
+            "wins_b = wins_b + excluded.wins_b, ties = ties + excluded.ties",
+            [(*pair, *totals) for pair, totals in pair_totals.items()])
+
+
+def run_benchmark(path: str, matches: int = 1_000_000, players: int = 5000, queries: int = 1000) -> Dict:
+    """Fill a database with random matches and time the indexed queries"""
+    import random
+
+    history = MatchHistory(path, batch_size=10_000)
+    names = [f"player{i}" for i in range(players)]
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    for _ in range(matches):
+        name1, name2 = rng.sample(names, 2)
+        history.record_match(name1, name2, rng.randrange(0, 300, 10), rng.randrange(0, 300, 10),
+                             rng.choice((1, 2, None)), "hit an obstacle!", "ran into themselves!")
+    enqueue_seconds = time.perf_counter() - start
+    history.flush()
+    write_seconds = time.perf_counter() - start
+
+    def time_query(query) -> float:
+        begin = time.perf_counter()
+        for _ in range(queries):
+            query()
+        return (time.perf_counter() - begin) / queries * 1000
+
+    report = {
+        "matches": matches,
+        "enqueue_us_per_match": enqueue_seconds / matches * 1e6,
+        "write_seconds": write_seconds,
+        "leaderboard_ms": time_query(lambda: history.leaderboard(10)),
+        "head_to_head_ms": time_query(lambda: history.head_to_head(*rng.sample(names, 2))),
+        "recent_matches_ms": time_query(lambda: history.recent_matches(rng.choice(names), 10)),
+    }
+    history.close()
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+
+    from .harness import print_report
+
+    parser = argparse.ArgumentParser(description="Match history write and query benchmark")
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run_benchmark(os.path.join(directory, "bench.db"), args.matches, args.players)
+    print_report(report, width=22)
@@ -4,18 +4,126 @@ Two-Player Snake Game
 A multiplayer snake game built with pygame featuring power-ups, obstacles, and player naming.
 """
 
+import argparse
 import pygame
 import sys
 from game import Game
+from game.bots import SearchBot
+from game.lockstep import LockstepPeer, bind_peer_socket
+from game.matchmaking import EloRatings
+from game.spectator import MatchRecorder, SpectatorChannel, SpectatorServer
+from game.metrics import REGISTRY, MetricsServer
+from game.snapshot import SnapshotError, SnapshotWriter, load_snapshot
+from game.storage import MatchHistory
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Two-Player Snake Game")
+    parser.add_argument("--spectator-port", type=int, default=None,
+                        help="Broadcast the match to read-only viewers on this TCP port")
+    parser.add_argument("--spectator-host", default="127.0.0.1",
+                        help="Interface to bind the spectator server to")
+    parser.add_argument("--record", default=None,
+                        help="Save the spectator stream to this file for later export")
+    parser.add_argument("--history-db", default="snake_history.db",
+                        help="SQLite file for player profiles and match results ('' to disable)")
+    parser.add_argument("--ratings-file", default="snake_ratings.json",
+                        help="JSON file of per-player Elo ratings ('' to disable)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-dump", default=None,
+                        help="Write a JSON snapshot of all metrics to this file on exit")
+    parser.add_argument("--walls", action="store_true",
+                        help="Board edges kill instead of wrapping around")
+    parser.add_argument("--bot", type=int, choices=(1, 2), action="append", default=[],
+                        help="Let a search bot control this player (repeatable)")
+    parser.add_argument("--bot-depth", type=int, default=4,
+                        help="Maximum plies the bot searches per move")
+    parser.add_argument("--bot-budget-ms", type=float, default=10.0,
+                        help="Time the bot may spend searching per move")
+    parser.add_argument("--lockstep-id", type=int, default=None,
+                        help="Play peer-to-peer as this peer (0 = green, 1 = blue, 2+ = watch)")
+    parser.add_argument("--peer", action="append", default=[], metavar="HOST:PORT",
+                        help="UDP address of every lockstep peer in id order, this one included")
+    parser.add_argument("--lockstep-seed", type=int, default=0,
+                        help="Match seed, identical on every peer")
+    parser.add_argument("--input-delay", type=int, default=3,
+                        help="Ticks between pressing a key and the turn taking effect")
+    parser.add_argument("--resume-file", default=None,
+                        help="Autosave the match to this file and resume from it on start")
+    parser.add_argument("--snapshot-interval", type=float, default=5.0,
+                        help="Seconds between autosaves while playing")
+    args = parser.parse_args()
+    if args.lockstep_id is not None:
+        if not 0 <= args.lockstep_id < len(args.peer) or len(args.peer) < 2:
+            parser.error("--lockstep-id needs at least two --peer addresses, its own included")
+        if args.bot:
+            parser.error("--bot cannot be combined with lockstep play")
+        if args.resume_file:
+            parser.error("--resume-file cannot be combined with lockstep play")
+    return args
+
+def parse_address(address: str):
+    host, _, port = address.rpartition(":")
+    return (host or "0.0.0.0", int(port))
 
 def main():
     """Main entry point for the snake game."""
+    args = parse_args()
+    
     # Initialize Pygame
     pygame.init()
     
+    spectator_server = None
+    recorder = None
+    history = None
+    ratings = None
+    metrics_server = None
+    lockstep = None
+    snapshots = None
     try:
+        if args.metrics_port is not None:
+            metrics_server = MetricsServer(REGISTRY, port=args.metrics_port)
+            metrics_server.start()
+        
+        # Persistent match history, written from a background thread
+        if args.history_db:
+            history = MatchHistory(args.history_db)
+        
+        # Elo ratings per player name, saved after each match from a background thread
+        if args.ratings_file:
+            ratings = EloRatings(args.ratings_file)
+            try:
+                ratings.load()
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unusable ratings file {args.ratings_file}: {e}")
+        
+        # Optionally start broadcasting to spectators
+        spectators = None
+        if args.spectator_port is not None or args.record:
+            spectators = SpectatorChannel()
+        if args.spectator_port is not None:
+            spectator_server = SpectatorServer(spectators, args.spectator_host, args.spectator_port)
+            spectator_server.start()
+        if args.record:
+            recorder = MatchRecorder(spectators, args.record)
+        
         # Create and run the game
-        game = Game()
+        bots = {player: SearchBot(player, args.bot_depth, args.bot_budget_ms) for player in args.bot}
+        if args.resume_file:
+            snapshots = SnapshotWriter(args.resume_file)
+        game = Game(spectators=spectators, history=history, bots=bots, walls=args.walls,
+                    snapshots=snapshots, snapshot_interval=int(args.snapshot_interval * 1000),
+                    ratings=ratings)
+        if args.resume_file:
+            try:
+                load_snapshot(game, args.resume_file)
+            except SnapshotError as e:
+                print(f"Ignoring unusable snapshot {args.resume_file}: {e}")
+        if args.lockstep_id is not None:
+            peers = {pid: parse_address(address) for pid, address in enumerate(args.peer)}
+            sock = bind_peer_socket(("0.0.0.0", peers[args.lockstep_id][1]))
+            lockstep = LockstepPeer(game, args.lockstep_id, sock, peers,
+                                    seed=args.lockstep_seed, input_delay=args.input_delay)
         game.run()
     except KeyboardInterrupt:
         print("\nGame interrupted by user")
@@ -23,7 +131,24 @@ def main():
         print(f"An error occurred: {e}")
         sys.exit(1)
     finally:
+        if lockstep:
+            lockstep.close()
+        if snapshots:
+            snapshots.close()
+        if spectator_server:
+            spectator_server.stop()
+        if recorder:
+            recorder.close()
+        if history:
+            history.close()
+        if ratings:
+            ratings.save()
+            ratings.close()
+        if metrics_server:
+            metrics_server.stop()
+        if args.metrics_dump:
+            REGISTRY.dump_json(args.metrics_dump)
         pygame.quit()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -0,0 +1,27 @@
+import pygame
+
+from game.enums import Direction
+from game.render import create_offscreen_game
+
+
+def test_two_turns_in_one_tick_are_applied_over_two_moves():
+    game = create_offscreen_game()
+    game.now = 0
+    game.start_game(seed=1)
+    snake = game.snake1
+    assert snake.direction == Direction.RIGHT
+    x, y = snake.get_head()
+
+    # UP then LEFT before the snake moves: LEFT alone would be a reversal
+    for key in (pygame.K_UP, pygame.K_LEFT):
+        game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key))
+    assert snake.direction == Direction.RIGHT
+    assert [turn for turn, _ in game.input1.turns] == [Direction.UP, Direction.LEFT]
+
+    moves = []
+    for _ in range(2):
+        game.update(game.last_move_time1 + game.get_speed(snake))
+        moves.append((snake.direction, snake.get_head()))
+
+    assert moves == [(Direction.UP, (x, y - 1)), (Direction.LEFT, (x - 1, y - 1))]
+    assert not game.input1.turns
@@ -0,0 +1,21 @@
+import json
+
+from game.matchmaking import EloRatings
+
+
+def test_ratings_are_saved_in_the_background_and_reload(tmp_path):
+    path = str(tmp_path / "ratings.json")
+    ratings = EloRatings(path)
+    ratings.record_result("alice", "bob", 1)
+    ratings.save()
+    ratings.record_result("alice", "bob", 1)
+    ratings.save()
+    ratings.close()
+
+    with open(path) as f:
+        assert json.load(f)["alice"][1] == 2  # The newest save wins
+
+    reloaded = EloRatings(path)
+    reloaded.load()
+    assert reloaded.rating("alice") == ratings.rating("alice")
+    assert reloaded.rating("bob") < reloaded.rating("alice")
@@ -0,0 +1,26 @@
+from game.metrics import MetricsRegistry
+
+
+def test_prometheus_output_names_match_their_metadata():
+    registry = MetricsRegistry()
+    registry.counter("ticks", "Ticks simulated").inc(3)
+    registry.counter("ticks").inc()  # Registering again returns the same counter
+    registry.gauge("fps", "Frames per second").set(60)
+    registry.histogram("frame_ms", "Frame time", buckets=(10, 20)).observe(15)
+
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP snake_ticks_total Ticks simulated",
+        "# TYPE snake_ticks_total counter",
+        "snake_ticks_total 4",
+        "# HELP snake_fps Frames per second",
+        "# TYPE snake_fps gauge",
+        "snake_fps 60",
+        "# HELP snake_frame_ms Frame time",
+        "# TYPE snake_frame_ms histogram",
+        'snake_frame_ms_bucket{le="10"} 0',
+        'snake_frame_ms_bucket{le="20"} 1',
+        'snake_frame_ms_bucket{le="+Inf"} 1',
+        "snake_frame_ms_sum 15.0",
+        "snake_frame_ms_count 1",
+    ]
+    assert registry.snapshot()["snake_ticks"] == 4
@@ -0,0 +1,23 @@
+from game.enums import GameState
+from game.render import apply_snapshot, create_offscreen_game, simulate_match
+from game.spectator import snapshot_game
+
+
+def test_snapshot_restores_the_clock_and_snake_timings():
+    live = create_offscreen_game()
+    for _ in simulate_match(live, seed=3):
+        pass
+    assert live.game_state == GameState.GAME_OVER
+    live.snake1.speed_boost_end = live.now + 700
+
+    replayed = create_offscreen_game()
+    apply_snapshot(replayed, snapshot_game(live))
+
+    assert replayed.now == live.now
+    for original, copy in ((live.snake1, replayed.snake1), (live.snake2, replayed.snake2)):
+        assert copy.death_time == original.death_time
+        assert copy.speed_boost_end == original.speed_boost_end
+        # Blinking and glowing follow the same phases as they did live
+        for later in range(0, 5000, 37):
+            now = live.now + later
+            assert copy.appearance(now) == original.appearance(now)
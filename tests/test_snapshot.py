@@ -0,0 +1,26 @@
+import time
+
+from game.snapshot import SnapshotWriter
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_writer_survives_a_failed_write(tmp_path, capsys):
+    directory = tmp_path / "missing"
+    writer = SnapshotWriter(str(directory / "match.snap"))
+
+    writer.submit(b"first")
+    wait_for(lambda: writer.failed_writes == 1)
+    assert "could not write" in capsys.readouterr().err
+
+    directory.mkdir()
+    writer.submit(b"second")
+    writer.close()
+
+    assert writer.writes == 1
+    assert (directory / "match.snap").read_bytes() == b"second"
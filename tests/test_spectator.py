@@ -0,0 +1,47 @@
+from game.render import create_offscreen_game
+from game.spectator import FrameDecoder, SpectatorChannel
+
+
+def idle_channel():
+    """A channel whose game sits on the name screen, publishing the same state"""
+    channel = SpectatorChannel()
+    game = create_offscreen_game(spectators=channel)
+    game.publish_spectators()
+    return channel, game
+
+
+def test_viewer_joining_while_idle_gets_a_keyframe():
+    channel, game = idle_channel()
+    subscriber = channel.subscribe()
+    for _ in range(5):
+        game.publish_spectators()
+
+    decoder = FrameDecoder()
+    decoder.feed(b"".join(subscriber.queue))
+    assert decoder.keyframes == 1
+    assert decoder.snapshot == channel.last_snapshot
+
+
+def test_unchanged_publish_resyncs_waiting_viewers():
+    channel, game = idle_channel()
+    subscriber = channel.subscribe()
+    subscriber.queue.clear()
+    subscriber.needs_keyframe = True  # e.g. its backlog was dropped
+
+    game.publish_spectators()
+
+    decoder = FrameDecoder()
+    decoder.feed(b"".join(subscriber.queue))
+    assert not subscriber.needs_keyframe
+    assert decoder.keyframes == 1
+    assert decoder.snapshot == channel.last_snapshot
+
+
+def test_viewers_in_sync_get_nothing_while_idle():
+    channel, game = idle_channel()
+    subscriber = channel.subscribe()
+    subscriber.queue.clear()
+
+    game.publish_spectators()
+
+    assert not subscriber.queue
@@ -0,0 +1,15 @@
+from game.storage import MatchHistory
+
+
+def test_recent_matches_lists_each_match_once(tmp_path):
+    history = MatchHistory(str(tmp_path / "history.db"))
+    history.record_match("alice", "alice", 5, 3, 1, played_at=1.0)
+    history.record_match("alice", "bob", 2, 4, 2, played_at=2.0)
+    history.record_match("bob", "alice", 1, 1, None, played_at=3.0)
+    history.flush()
+
+    matches = history.recent_matches("alice")
+    history.close()
+
+    assert [m["played_at"] for m in matches] == [3.0, 2.0, 1.0]
+    assert (matches[2]["player1"], matches[2]["player2"]) == ("alice", "alice")